@@ -2,16 +2,54 @@
 
 import os
 import google.generativeai as genai
+from google.ai import generativelanguage as glm
 import openai
 from config import Config
 from cryptography.fernet import Fernet
 import json
 import logging
 import asyncio
+import threading
+import queue
+import concurrent.futures
 
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
+# Decrypted API keys kept in memory per AIService instance
+DECRYPTED_KEY_CACHE_SIZE = 256
+
+# Gemini models (each with its own client) kept per AIService instance
+GEMINI_MODEL_CACHE_SIZE = 64
+
+# Tools (functions) the AI can call. Gemini only uses their signatures and
+# docstrings to build the tool schema; the actual work happens in
+# chatbot.execute_function_call. Defined once at import time.
+
+def get_user_bills():
+    """Returns a list of all bills for the current user."""
+    return {"bills_list": ["Internet bill", "Electricity bill", "Rent"]}
+
+def get_upcoming_payments(days: int = 7):
+    """Returns a list of unpaid bills due within a specified number of days."""
+    return {"upcoming_payments": [{"bill_name": "Internet bill", "due_date": "2025-08-15"}]}
+
+def get_loan_summary():
+    """Returns a summary of the user's active loans and EMIs."""
+    return {"loan_summary": "You have 1 active loan with a remaining balance of $500."}
+
+def create_bill(name: str, amount: float, due_date: str, category: str, frequency: str):
+    """Creates a new bill reminder."""
+    # The tool would return a success message or an error
+    return {"status": "success", "message": f"Bill '{name}' for ${amount} created."}
+
+_TOOLS = [
+    get_user_bills,
+    get_upcoming_payments,
+    get_loan_summary,
+    create_bill
+]
+
+
 class AIService:
     
     def __init__(self, app_config):
@@ -24,6 +62,28 @@ class AIService:
         
         self.cipher_suite = Fernet(encryption_key.encode())
         
+        # Long-lived event loop for AI calls, so requests don't pay for a new
+        # loop (and new client connections) on every message
+        self._loop = asyncio.new_event_loop()
+        self._loop_thread = threading.Thread(
+            target=self._loop.run_forever,
+            name='ai-service-loop',
+            daemon=True
+        )
+        self._loop_thread.start()
+        logger.info("[AI SERVICE] Background event loop started.")
+        
+        # Bound concurrent Gemini calls to stay under the provider's rate limits
+        self._gemini_sem = asyncio.Semaphore(int(self.app_config.get('GEMINI_MAX_CONCURRENCY', 8)))
+        
+        # Gemini models are built once per API key and reused across requests (bounded)
+        self._model_cache = {}
+        self._model_cache_lock = threading.Lock()
+        
+        # ciphertext -> plaintext for recently used API keys, bounded per instance
+        self._decrypted_keys = {}
+        self._decrypted_keys_lock = threading.Lock()
+        
         try:
             # Configure Gemini and OpenAI clients on initialization
             if Config.GOOGLE_API_KEY:
@@ -34,26 +94,121 @@ class AIService:
         except Exception as e:
             logger.error(f"[AI SERVICE ERROR] Failed to configure AI clients: {str(e)}")
 
+    def submit_coroutine(self, coro, app=None):
+        """
+        Schedules a coroutine on the service's event loop and returns its future.
+        If an app is given, the coroutine runs inside its application context.
+        """
+        if app is not None:
+            coro = self._with_app_context(app, coro)
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    def run_coroutine(self, coro, app=None, timeout=None):
+        """
+        Runs a coroutine on the service's event loop and waits for its result.
+        On timeout the coroutine is cancelled so it stops holding loop resources.
+        """
+        future = self.submit_coroutine(coro, app)
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise TimeoutError(f"AI request did not complete within {timeout} seconds")
+
+    def iterate_async(self, agen, app=None, timeout=None):
+        """
+        Consumes an async generator on the service's event loop and yields its
+        items to the calling (synchronous) thread as they arrive. If no item
+        arrives within timeout seconds, or the caller stops iterating early,
+        the generator is cancelled so it stops holding loop resources.
+        """
+        items = queue.Queue()
+        
+        async def pump():
+            try:
+                async for item in agen:
+                    items.put((True, item))
+            except Exception as e:
+                items.put((False, e))
+            finally:
+                items.put(None)
+        
+        future = self.submit_coroutine(pump(), app)
+        
+        try:
+            while True:
+                try:
+                    entry = items.get(timeout=timeout)
+                except queue.Empty:
+                    raise TimeoutError(f"AI stream produced nothing for {timeout} seconds")
+                if entry is None:
+                    return
+                ok, value = entry
+                if not ok:
+                    raise value
+                yield value
+        finally:
+            # No-op once the pump has finished; otherwise stops a stalled or abandoned stream
+            future.cancel()
+
+    @staticmethod
+    async def _with_app_context(app, coro):
+        with app.app_context():
+            return await coro
+
     def encrypt_api_key(self, key: str) -> str:
         """Encrypts an API key for secure storage."""
         return self.cipher_suite.encrypt(key.encode()).decode()
 
     def decrypt_api_key(self, encrypted_key: str) -> str:
         """Decrypts a stored API key."""
-        return self.cipher_suite.decrypt(encrypted_key.encode()).decode()
+        # A Fernet token always decrypts to the same plaintext, so the ciphertext
+        # is a safe cache key; updating a key stores a new token.
+        with self._decrypted_keys_lock:
+            key = self._decrypted_keys.get(encrypted_key)
+        if key is None:
+            key = self.cipher_suite.decrypt(encrypted_key.encode()).decode()
+            with self._decrypted_keys_lock:
+                if len(self._decrypted_keys) >= DECRYPTED_KEY_CACHE_SIZE:
+                    # Evict the oldest entry (dicts keep insertion order)
+                    self._decrypted_keys.pop(next(iter(self._decrypted_keys)))
+                self._decrypted_keys[encrypted_key] = key
+        return key
+
+    def _get_gemini_model(self, api_key: str, with_tools: bool = True):
+        """
+        Returns the cached Gemini model for an API key, creating it on first use.
+        Each model gets its own async client built with that key, so it never
+        depends on what genai.configure was last given. Call it from the
+        service's event loop, which the client's channel binds to.
+        """
+        cache_key = (api_key, with_tools)
+        with self._model_cache_lock:
+            model = self._model_cache.get(cache_key)
+            if model is None:
+                model = genai.GenerativeModel(
+                    'gemini-1.5-flash-latest',
+                    tools=_TOOLS if with_tools else None
+                )
+                # generate_content_async only falls back to the global client when this is unset
+                model._async_client = glm.GenerativeServiceAsyncClient(client_options={'api_key': api_key})
+                if len(self._model_cache) >= GEMINI_MODEL_CACHE_SIZE:
+                    # Evict the oldest entry (dicts keep insertion order)
+                    self._model_cache.pop(next(iter(self._model_cache)))
+                self._model_cache[cache_key] = model
+            return model
 
     async def chat_with_gemini(self, messages: list, api_key: str, context: dict):
         """
         Communicates with the Google Gemini API.
         """
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel('gemini-1.5-flash-latest', tools=self._get_tools())
-        
-        # Format message history for Gemini
-        history = [{'role': m['role'], 'parts': [m['content']]} for m in messages]
+        # messages is a sequence of (role, content) pairs
+        history = [{'role': role, 'parts': [content]} for role, content in messages]
         
         try:
-            response = await model.generate_content_async(history)
+            async with self._gemini_sem:
+                model = self._get_gemini_model(api_key)
+                response = await model.generate_content_async(history)
             
             if response.candidates and response.candidates[0].content.parts[0].function_call:
                 function_call = response.candidates[0].content.parts[0].function_call
@@ -65,6 +220,54 @@ class AIService:
             logger.error(f"[GEMINI CHAT ERROR] {e}")
             return "Sorry, I couldn't process that request with Gemini.", None
 
+    async def stream_with_gemini(self, messages: list, api_key: str, context: dict):
+        """
+        Streams a Gemini reply, yielding ('text', chunk) tuples as they arrive.
+        If Gemini asks for a function call, yields ('function_call', call) and stops.
+        """
+        # messages is a sequence of (role, content) pairs
+        history = [{'role': role, 'parts': [content]} for role, content in messages]
+        
+        try:
+            async with self._gemini_sem:
+                model = self._get_gemini_model(api_key)
+                response = await model.generate_content_async(history, stream=True)
+                
+                async for chunk in response:
+                    parts = chunk.candidates[0].content.parts if chunk.candidates else []
+                    if parts and parts[0].function_call:
+                        yield 'function_call', parts[0].function_call
+                        return
+                    text = ''.join(part.text for part in parts if getattr(part, 'text', None))
+                    if text:
+                        yield 'text', text
+        
+        except Exception as e:
+            logger.error(f"[GEMINI STREAM ERROR] {e}")
+            yield 'text', "Sorry, I couldn't process that request with Gemini."
+
+    async def summarize_with_gemini(self, messages: list, api_key: str, previous_summary: str = None) -> str:
+        """
+        Folds older conversation turns into a short running summary.
+        """
+        transcript = "\n".join(f"{role}: {content}" for role, content in messages)
+        prompt = (
+            "Summarize this bill-assistant conversation in a few sentences, keeping "
+            "any bills, amounts, dates and user requests that may matter later.\n\n"
+        )
+        if previous_summary:
+            prompt += f"Summary so far:\n{previous_summary}\n\n"
+        prompt += f"New messages:\n{transcript}"
+        
+        try:
+            async with self._gemini_sem:
+                model = self._get_gemini_model(api_key, with_tools=False)
+                response = await model.generate_content_async(prompt)
+            return response.text
+        except Exception as e:
+            logger.error(f"[GEMINI SUMMARY ERROR] {e}")
+            return previous_summary
+
     async def chat_with_openai(self, messages: list, api_key: str, context: dict):
         """
         Communicates with the OpenAI API.
@@ -73,37 +276,3 @@ class AIService:
         # For simplicity, this is a placeholder
         logger.warning("[OPENAI CHAT] OpenAI functionality is a placeholder.")
         return "Sorry, OpenAI support is currently a placeholder.", None
-
-    def _get_tools(self):
-        """
-        Defines the available tools (functions) the AI can call.
-        These functions must be defined within a class or module and be callable.
-        """
-        # This is where you would define the actual tool functions.
-        # For now, let's keep them as placeholders that return a dummy response.
-        # In a full implementation, these would call helper functions
-        # that interact with your database (e.g., from chatbot.py)
-        
-        def get_user_bills():
-            """Returns a list of all bills for the current user."""
-            return {"bills_list": ["Internet bill", "Electricity bill", "Rent"]}
-        
-        def get_upcoming_payments(days: int = 7):
-            """Returns a list of unpaid bills due within a specified number of days."""
-            return {"upcoming_payments": [{"bill_name": "Internet bill", "due_date": "2025-08-15"}]}
-
-        def get_loan_summary():
-            """Returns a summary of the user's active loans and EMIs."""
-            return {"loan_summary": "You have 1 active loan with a remaining balance of $500."}
-
-        def create_bill(name: str, amount: float, due_date: str, category: str, frequency: str):
-            """Creates a new bill reminder."""
-            # The tool would return a success message or an error
-            return {"status": "success", "message": f"Bill '{name}' for ${amount} created."}
-
-        return [
-            get_user_bills,
-            get_upcoming_payments,
-            get_loan_summary,
-            create_bill
-        ]
@@ -3,9 +3,22 @@ import logging
 
 from flask import Flask, jsonify, request
 from flask_cors import CORS
+from flask_compress import Compress
 from flask_jwt_extended import JWTManager
 from config import Config
+
+# Configure logging once, before the modules below log at import time. An unknown
+# LOG_LEVEL falls back to WARNING rather than stopping the app from starting.
+_log_level = Config.LOG_LEVEL if isinstance(logging.getLevelName(Config.LOG_LEVEL), int) else 'WARNING'
+logging.basicConfig(
+    level=_log_level,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+if _log_level != Config.LOG_LEVEL:
+    logging.getLogger(__name__).warning(f"[APP CONFIG] Unknown LOG_LEVEL '{Config.LOG_LEVEL}', using WARNING")
+
 from models import db
+from sqlalchemy import String, inspect, text
 from auth import auth_bp
 from bills import bills_bp
 from reminders import reminders_bp
@@ -18,11 +31,6 @@ import os
 import logging
 from datetime import datetime
 
-# Configure logging
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
 logger = logging.getLogger(__name__)
 
 # app.py
@@ -49,6 +57,11 @@ def create_app():
     logger.debug(f"[APP CONFIG] Database URI: {app.config.get('SQLALCHEMY_DATABASE_URI', 'NOT SET')}")
     logger.debug(f"[APP CONFIG] JWT Algorithm: {app.config.get('JWT_ALGORITHM', 'NOT SET')}")
     
+    # jsonify output is never read by people: skip the per-dict key sort and the
+    # debug-mode indentation so the stdlib encoder does less work per response
+    app.json.sort_keys = False
+    app.json.compact = True
+    
     # Set max file size for uploads
     app.config['MAX_CONTENT_LENGTH'] = Config.MAX_CONTENT_LENGTH
     logger.info(f"[APP CONFIG] Max content length set to: {Config.MAX_CONTENT_LENGTH} bytes ({Config.MAX_CONTENT_LENGTH / 1024 / 1024}MB)")
@@ -65,6 +78,9 @@ def create_app():
     logger.debug("[APP INIT] Initializing JWT Manager")
     JWTManager(app)
     
+    logger.debug("[APP INIT] Initializing response compression")
+    Compress(app)
+    
     # Initialize local storage
     logger.info("[APP INIT] Initializing local storage")
     init_storage()
@@ -125,6 +141,70 @@ def create_app():
     return app
 
 
+def upgrade_schema():
+    """
+    Bring tables created by an older version up to the current models.
+    create_all() never alters existing tables, so columns added since then
+    are created here and PostgreSQL keys are converted to native uuid. Each
+    step checks first and is a no-op once applied.
+    """
+    from chatbot_models import ChatSession
+    
+    inspector = inspect(db.engine)
+    table = ChatSession.__table__
+    if inspector.has_table(table.name):
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        with db.engine.begin() as conn:
+            for name in ('summary', 'summary_through'):
+                if name in existing:
+                    continue
+                ddl_type = table.c[name].type.compile(dialect=db.engine.dialect)
+                conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {name} {ddl_type}"))
+                logger.info(f"[SCHEMA UPGRADE] Added column {table.name}.{name}")
+    
+    if db.engine.dialect.name == 'postgresql':
+        # Keys from before UUID_KEY are VARCHAR(36); convert them to native uuid. The
+        # foreign keys between them are dropped first and recreated once both ends match.
+        quote = db.engine.dialect.identifier_preparer.quote
+        pending = []
+        for table in db.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            reflected = {column['name']: column['type'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if not (column.primary_key or column.foreign_keys):
+                    continue
+                if column.type.compile(dialect=db.engine.dialect) == 'UUID' and isinstance(reflected.get(column.name), String):
+                    pending.append((table.name, column.name))
+        
+        if pending:
+            converting = set(pending)
+            foreign_keys = []
+            for table_name in inspector.get_table_names():
+                for fk in inspector.get_foreign_keys(table_name):
+                    local = {(table_name, name) for name in fk['constrained_columns']}
+                    remote = {(fk['referred_table'], name) for name in fk['referred_columns']}
+                    if (local | remote) & converting:
+                        foreign_keys.append((table_name, fk))
+            
+            with db.engine.begin() as conn:
+                for table_name, fk in foreign_keys:
+                    conn.execute(text(f"ALTER TABLE {quote(table_name)} DROP CONSTRAINT {quote(fk['name'])}"))
+                for table_name, name in pending:
+                    col = quote(name)
+                    conn.execute(text(f"ALTER TABLE {quote(table_name)} ALTER COLUMN {col} TYPE uuid USING {col}::uuid"))
+                    logger.info(f"[SCHEMA UPGRADE] Converted {table_name}.{name} to uuid")
+                for table_name, fk in foreign_keys:
+                    columns = ', '.join(quote(name) for name in fk['constrained_columns'])
+                    referred = ', '.join(quote(name) for name in fk['referred_columns'])
+                    options = ''.join(f" ON {key[2:].upper()} {value}" for key, value in fk.get('options', {}).items()
+                                      if key in ('ondelete', 'onupdate'))
+                    conn.execute(text(
+                        f"ALTER TABLE {quote(table_name)} ADD CONSTRAINT {quote(fk['name'])} "
+                        f"FOREIGN KEY ({columns}) REFERENCES {quote(fk['referred_table'])} ({referred}){options}"
+                    ))
+
+
 app = create_app()
 
 if __name__ == '__main__':
@@ -144,6 +224,15 @@ if __name__ == '__main__':
             db.create_all()
             logger.info("[MAIN] Database tables created successfully")
             
+            upgrade_schema()
+            logger.info("[MAIN] Database schema up to date")
+            
+            # create_all() skips tables that already exist, so add any indexes they are missing
+            for table in db.metadata.sorted_tables:
+                for index in table.indexes:
+                    index.create(bind=db.engine, checkfirst=True)
+            logger.info("[MAIN] Database indexes verified")
+            
             # Log table information
             tables = db.metadata.tables.keys()
             logger.debug(f"[MAIN] Created tables: {', '.join(tables)}")
@@ -1,13 +1,12 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from models import db, Bill, Payment
+from models import db, Bill, Payment, LoanDetails
+from loans import build_emi_bills
 from datetime import datetime
 import logging
 
 
 
-# Configure logging
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
 bills_bp = Blueprint('bills', __name__)
@@ -59,6 +58,12 @@ def create_bill():
     data = request.get_json()
     logger.debug(f"[CREATE BILL] Request data keys: {list(data.keys()) if data else 'No data'}")
     
+    # A loan bill can be sent together with its loan details as {'bill': ..., 'loan': ...}
+    loan_data = None
+    if data and 'bill' in data:
+        loan_data = data.get('loan')
+        data = data['bill']
+    
     # Validate required fields
     required = ['name', 'amount', 'due_date', 'category', 'frequency']
     missing_fields = [field for field in required if field not in data]
@@ -105,8 +110,26 @@ def create_bill():
     else:
         logger.debug("[CREATE BILL] Using default reminder preferences")
     
+    if loan_data:
+        try:
+            # Saved with the bill in the same commit
+            bill.loan_details = LoanDetails(
+                total_amount=loan_data['total_amount'],
+                monthly_payment=loan_data['monthly_payment'],
+                total_installments=loan_data['total_installments'],
+                installments_paid=loan_data.get('installments_paid', 0),
+                interest_rate_percent=loan_data.get('interest_rate_percent', 0)
+            )
+        except KeyError as e:
+            logger.warning(f"[CREATE BILL] Missing loan field: {e}")
+            return jsonify({'message': 'Missing required loan fields'}), 400
+        logger.debug(f"[CREATE BILL] Loan details attached - Total: {loan_data['total_amount']}, Installments: {loan_data['total_installments']}")
+    
     try:
         db.session.add(bill)
+        if bill.loan_details:
+            # Upcoming installments go in with the loan as one batched insert
+            db.session.add_all(build_emi_bills(bill, bill.loan_details))
         db.session.commit()
         logger.info(f"[CREATE BILL] Bill created successfully with ID: {bill.id}")
     except Exception as e:
@@ -132,8 +155,12 @@ def create_bill():
         }
     }
     
+    if bill.loan_details:
+        response_data['loan_id'] = bill.loan_details.id
+    
     logger.debug(f"[CREATE BILL] Returning bill data: {response_data['id']}")
-    return jsonify(response_data), 201
+    # Clients that only need the new id can read it from Location without decoding the body
+    return jsonify(response_data), 201, {'Location': f"/api/bills/{bill.id}"}
 
 @bills_bp.route('/<bill_id>', methods=['PUT'])
 @jwt_required()
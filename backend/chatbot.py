@@ -1,23 +1,39 @@
 # chatbot.py - API endpoints for chatbot functionality
 
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, request, jsonify, current_app, Response, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from models import db, Bill, User, LoanDetails
+from models import db, Bill, User, LoanDetails, new_id
 from chatbot_models import ChatSession, ChatMessage, ChatPreferences
 # We need to import the class, but not instantiate it here.
 from ai_service import AIService
+from collections import OrderedDict
 from datetime import datetime, timedelta
+from sqlalchemy import func, select, event, tuple_
+from sqlalchemy.orm import load_only
 import json
 import asyncio
+import time
 import logging
 
 
-# Configure logging
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
 chatbot_bp = Blueprint('chatbot', __name__)
 
+# Chat history pagination
+HISTORY_PAGE_SIZE = 50
+HISTORY_MAX_PAGE_SIZE = 200
+
+# Per-process cache of suggestion payloads: user_id -> (expires_at, payload), oldest first
+SUGGESTIONS_CACHE_TTL = 30
+SUGGESTIONS_CACHE_MAX_SIZE = 10000
+_suggestions_cache = OrderedDict()
+
+# Number of recent messages sent to the AI on each turn; older messages are
+# folded into the session summary once SUMMARY_BATCH_SIZE of them build up
+HISTORY_WINDOW = 20
+SUMMARY_BATCH_SIZE = 10
+
 # In chatbot.py
 
 # ... (other code) ...
@@ -36,15 +52,14 @@ def create_chat_session():
         preferences = ChatPreferences.query.filter_by(user_id=user_id).first()
         ai_provider = data.get('ai_provider', preferences.preferred_ai if preferences else 'gemini')
         
-        # Create new session
+        # Create new session with a client-side id so the first message can
+        # reference it before anything is flushed
         session = ChatSession(
+            id=new_id(),
             user_id=user_id,
             ai_provider=ai_provider
         )
         
-        db.session.add(session)
-        db.session.commit()
-        
         # Add initial system message with a supported role
         system_msg = ChatMessage(
             session_id=session.id,
@@ -52,7 +67,8 @@ def create_chat_session():
             content='Chat session started. How can I help you with your bills today?'
         )
         
-        db.session.add(system_msg)
+        # Insert both in a single transaction
+        db.session.add_all([session, system_msg])
         db.session.commit()
         
         logger.info(f"[CHATBOT] Session created: {session.id}")
@@ -88,81 +104,35 @@ def send_message():
     logger.info(f"[CHATBOT] Processing message for session {session_id}")
     
     try:
-        # Verify session belongs to user
-        session = ChatSession.query.filter_by(
-            id=session_id,
-            user_id=user_id,
-            is_active=True
-        ).first()
+        turn = start_turn(user_id, session_id, message_content)
         
-        if not session:
+        if not turn:
             return jsonify({'message': 'Invalid or inactive session'}), 404
         
-        # Save user message
-        user_msg = ChatMessage(
-            session_id=session_id,
-            role='user',
-            content=message_content
-        )
-        db.session.add(user_msg)
-        db.session.commit()
-        
-        # Get conversation history
-        messages = ChatMessage.query.filter_by(session_id=session_id).order_by(ChatMessage.timestamp).all()
-        
-        message_history = [
-            {'role': msg.role, 'content': msg.content}
-            for msg in messages
-        ]
+        app = current_app._get_current_object()
         
         # Get user context
-        user_context = get_user_context(user_id)
+        user_context = app.ai_service.run_coroutine(get_user_context(user_id, app))
         
-        # Get AI response
-        response_text, function_call = asyncio.run(
-            get_ai_response(session.ai_provider, message_history, user_id, user_context)
-        )
+        # The key lookup hits the DB, so resolve it here rather than on the AI loop
+        api_key = get_ai_api_key(turn['session'].ai_provider, user_id)
         
-        if function_call:
-            func_name = function_call.name
-            
-            # FIX: Convert func_args to a dictionary
-            try:
-                func_args = dict(function_call.args)
-            except (TypeError, ValueError):
-                func_args = {}
-            
-            # The rest of the function call remains the same
-            function_response = execute_function_call({'name': func_name, 'arguments': func_args}, user_id)
-            
-            # Save function call details
-            assistant_msg = ChatMessage(
-                session_id=session_id,
-                role='assistant',
-                content=response_text,
-                function_call=json.dumps({'name': func_name, 'args': func_args}),
-                function_response=json.dumps(function_response)
-            )
-            
-            # Generate a user-friendly response based on function results
-            response_text = format_function_response(func_name, function_response, response_text)
-        else:
-            # Save assistant response
-            assistant_msg = ChatMessage(
-                session_id=session_id,
-                role='assistant',
-                content=response_text
-            )
+        # Get AI response on the service's persistent event loop; the request
+        # thread only blocks for up to AI_REQUEST_TIMEOUT seconds
+        response_text, function_call = app.ai_service.run_coroutine(
+            get_ai_response(turn['session'].ai_provider, turn['history'], api_key, user_context),
+            app,
+            timeout=app.config.get('AI_REQUEST_TIMEOUT')
+        )
         
-        db.session.add(assistant_msg)
-        db.session.commit()
+        response_text, function_data = finish_turn(turn, user_id, response_text, function_call, app)
         
         logger.info(f"[CHATBOT] Response generated for session {session_id}")
         
         return jsonify({
             'response': response_text,
-            'function_executed': function_call is not None,
-            'function_data': {'name': func_name, 'args': func_args} if function_call else None
+            'function_executed': function_data is not None,
+            'function_data': function_data
         }), 200
         
     except Exception as e:
@@ -170,6 +140,202 @@ def send_message():
         db.session.rollback()
         return jsonify({'message': 'Failed to process message', 'error': str(e)}), 500
 
+@chatbot_bp.route('/chat/message/stream', methods=['POST'])
+@jwt_required()
+def send_message_stream():
+    """Send a message to the chatbot and stream the response as server-sent events.
+    
+    Emits 'chunk' events with partial text, then a single 'done' event with the
+    same payload as /chat/message (or an 'error' event). Turns that end in a
+    function call are not streamed; their formatted result arrives in 'done'.
+    """
+    user_id = get_jwt_identity()
+    data = request.get_json()
+    
+    session_id = data.get('session_id')
+    message_content = data.get('message')
+    
+    if not session_id or not message_content:
+        return jsonify({'message': 'Session ID and message are required'}), 400
+    
+    logger.info(f"[CHATBOT] Streaming message for session {session_id}")
+    
+    try:
+        turn = start_turn(user_id, session_id, message_content)
+        
+        if not turn:
+            return jsonify({'message': 'Invalid or inactive session'}), 404
+        
+        app = current_app._get_current_object()
+        user_context = app.ai_service.run_coroutine(get_user_context(user_id, app))
+        
+    except Exception as e:
+        logger.error(f"[CHATBOT ERROR] Failed to start streamed message: {str(e)}")
+        db.session.rollback()
+        return jsonify({'message': 'Failed to process message', 'error': str(e)}), 500
+    
+    def generate():
+        parts = []
+        function_call = None
+        
+        try:
+            api_key = get_ai_api_key(turn['session'].ai_provider, user_id)
+            
+            if turn['session'].ai_provider == 'gemini':
+                stream = app.ai_service.stream_with_gemini(turn['history'], api_key, user_context)
+                
+                # Each chunk must arrive within AI_REQUEST_TIMEOUT; closing the iterator
+                # (on a function call or when the client disconnects) cancels the stream
+                chunks = app.ai_service.iterate_async(stream, timeout=app.config.get('AI_REQUEST_TIMEOUT'))
+                try:
+                    for kind, value in chunks:
+                        if kind == 'function_call':
+                            function_call = value
+                            break
+                        parts.append(value)
+                        yield format_sse('chunk', {'text': value})
+                finally:
+                    chunks.close()
+            else:
+                response_text, function_call = app.ai_service.run_coroutine(
+                    get_ai_response(turn['session'].ai_provider, turn['history'], api_key, user_context),
+                    app,
+                    timeout=app.config.get('AI_REQUEST_TIMEOUT')
+                )
+                if not function_call:
+                    parts.append(response_text)
+                    yield format_sse('chunk', {'text': response_text})
+            
+            response_text, function_data = finish_turn(turn, user_id, ''.join(parts), function_call, app)
+            
+            logger.info(f"[CHATBOT] Streamed response completed for session {session_id}")
+            
+            yield format_sse('done', {
+                'response': response_text,
+                'function_executed': function_data is not None,
+                'function_data': function_data
+            })
+            
+        except Exception as e:
+            logger.error(f"[CHATBOT ERROR] Failed to stream message: {str(e)}")
+            db.session.rollback()
+            yield format_sse('error', {'message': 'Failed to process message', 'error': str(e)})
+    
+    return Response(stream_with_context(generate()), mimetype='text/event-stream')
+
+def format_sse(event: str, payload: dict) -> str:
+    """Format a server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+def start_turn(user_id: str, session_id: str, message_content: str):
+    """Verify the session, stage the user message and build the AI history window.
+    
+    Returns None if the session is invalid, otherwise a dict with the session, the
+    history to send to the AI and the bookkeeping needed to update the summary.
+    """
+    # Verify session belongs to user
+    session = ChatSession.query.filter_by(
+        id=session_id,
+        user_id=user_id,
+        is_active=True
+    ).first()
+    
+    if not session:
+        return None
+    
+    # Stage user message; it is committed together with the assistant reply
+    user_msg = ChatMessage(
+        session_id=session_id,
+        role='user',
+        content=message_content
+    )
+    db.session.add(user_msg)
+    
+    # Get the most recent slice of conversation history. Autoflush is off so the
+    # staged message isn't written (and its transaction opened) before the AI call;
+    # it is appended in memory as the newest entry instead.
+    with db.session.no_autoflush:
+        messages = ChatMessage.query.filter_by(session_id=session_id).order_by(
+            ChatMessage.timestamp.desc()
+        ).limit(HISTORY_WINDOW - 1).all()
+    messages.reverse()
+    messages.append(user_msg)
+    
+    # (role, content) pairs, prefixed by the rolling summary of older turns
+    message_history = []
+    if session.summary:
+        message_history.append(('model', f"Summary of the earlier conversation: {session.summary}"))
+    message_history.extend((msg.role, msg.content) for msg in messages)
+    
+    # Count messages that slid out of the window but aren't summarized yet
+    pending_summary = 0
+    window_start = messages[0].timestamp if messages else None
+    if len(messages) == HISTORY_WINDOW and window_start:
+        pending_query = ChatMessage.query.filter(
+            ChatMessage.session_id == session_id,
+            ChatMessage.timestamp < window_start
+        )
+        if session.summary_through:
+            pending_query = pending_query.filter(ChatMessage.timestamp > session.summary_through)
+        with db.session.no_autoflush:
+            pending_summary = pending_query.count()
+    
+    return {
+        'session': session,
+        'history': message_history,
+        'pending_summary': pending_summary,
+        'window_start': window_start
+    }
+
+def finish_turn(turn: dict, user_id: str, response_text: str, function_call, app) -> tuple:
+    """Run any requested function, persist the turn and return (response_text, function_data)"""
+    session = turn['session']
+    function_data = None
+    
+    if function_call:
+        func_name = function_call.name
+        
+        # FIX: Convert func_args to a dictionary
+        try:
+            func_args = dict(function_call.args)
+        except (TypeError, ValueError):
+            func_args = {}
+        
+        function_data = {'name': func_name, 'args': func_args}
+        function_response = execute_function_call({'name': func_name, 'arguments': func_args}, user_id)
+        
+        # Save function call details
+        assistant_msg = ChatMessage(
+            session_id=session.id,
+            role='assistant',
+            content=response_text,
+            function_call=function_data,
+            function_response=function_response
+        )
+        
+        # Generate a user-friendly response based on function results
+        response_text = format_function_response(func_name, function_response, response_text)
+    else:
+        # Save assistant response
+        assistant_msg = ChatMessage(
+            session_id=session.id,
+            role='assistant',
+            content=response_text
+        )
+    
+    # Persist both sides of the turn in a single transaction
+    db.session.add(assistant_msg)
+    db.session.commit()
+    
+    if session.ai_provider == 'gemini' and turn['pending_summary'] >= SUMMARY_BATCH_SIZE:
+        logger.info(f"[CHATBOT] Summarizing {turn['pending_summary']} older messages for session {session.id}")
+        app.ai_service.submit_coroutine(
+            update_session_summary(session.id, user_id, turn['window_start'], app),
+            app
+        )
+    
+    return response_text, function_data
+
 # ... (rest of the file) ...
 
 @chatbot_bp.route('/chat/history/<session_id>', methods=['GET'])
@@ -178,8 +344,10 @@ def get_chat_history(session_id):
     """Get chat history for a session"""
     user_id = get_jwt_identity()
     
-    # Verify session belongs to user
-    session = ChatSession.query.filter_by(
+    # Verify session belongs to user (skipping the potentially large summary)
+    session = ChatSession.query.options(
+        load_only(ChatSession.id, ChatSession.ai_provider)
+    ).filter_by(
         id=session_id,
         user_id=user_id
     ).first()
@@ -187,8 +355,38 @@ def get_chat_history(session_id):
     if not session:
         return jsonify({'message': 'Session not found'}), 404
     
-    # Get messages
-    messages = ChatMessage.query.filter_by(session_id=session_id).order_by(ChatMessage.timestamp).all()
+    # Keyset pagination: newest page first, older pages via ?cursor=<timestamp>|<id>.
+    # The id breaks ties between messages that share a timestamp.
+    size = request.args.get('size', HISTORY_PAGE_SIZE, type=int)
+    size = max(1, min(size, HISTORY_MAX_PAGE_SIZE))
+    cursor = request.args.get('cursor')
+    
+    # Plain column rows: the page is only serialized, so skip ORM object hydration
+    query = db.session.query(
+        ChatMessage.id,
+        ChatMessage.role,
+        ChatMessage.content,
+        ChatMessage.function_call,
+        ChatMessage.function_response,
+        ChatMessage.timestamp
+    ).filter(ChatMessage.session_id == session_id)
+    if cursor:
+        cursor_ts, _, cursor_id = cursor.partition('|')
+        try:
+            cursor_dt = datetime.fromisoformat(cursor_ts)
+        except ValueError:
+            return jsonify({'message': 'Invalid cursor'}), 400
+        if not cursor_id:
+            return jsonify({'message': 'Invalid cursor'}), 400
+        query = query.filter(tuple_(ChatMessage.timestamp, ChatMessage.id) < (cursor_dt, cursor_id))
+    
+    messages = query.order_by(ChatMessage.timestamp.desc(), ChatMessage.id.desc()).limit(size + 1).all()
+    has_more = len(messages) > size
+    messages = messages[:size]
+    next_cursor = f"{messages[-1].timestamp.isoformat()}|{messages[-1].id}" if has_more else None
+    
+    # Return the page in chronological order for display
+    messages.reverse()
     
     history = []
     for msg in messages:
@@ -200,16 +398,18 @@ def get_chat_history(session_id):
         }
         
         if msg.function_call:
-            msg_data['function_call'] = json.loads(msg.function_call)
+            msg_data['function_call'] = msg.function_call
         if msg.function_response:
-            msg_data['function_response'] = json.loads(msg.function_response)
+            msg_data['function_response'] = msg.function_response
         
         history.append(msg_data)
     
     return jsonify({
         'session_id': session_id,
         'ai_provider': session.ai_provider,
-        'messages': history
+        'messages': history,
+        'has_more': has_more,
+        'next_cursor': next_cursor
     }), 200
 
 @chatbot_bp.route('/chat/preferences', methods=['GET', 'PUT'])
@@ -275,27 +475,33 @@ def get_suggestions():
     """Get suggested queries based on user's current bills"""
     user_id = get_jwt_identity()
     
-    # Get user's bills
-    bills = Bill.query.filter_by(user_id=user_id).all()
+    cached = _suggestions_cache.get(user_id)
+    if cached and cached[0] > time.monotonic():
+        return jsonify(cached[1]), 200
     
     suggestions = []
+    now = datetime.now()
+    
+    # Cheap existence probes instead of loading every bill
+    unpaid = db.session.query(Bill.id).filter(
+        Bill.user_id == user_id,
+        Bill.is_paid == False
+    )
     
     # Check for overdue bills
-    overdue_bills = [b for b in bills if not b.is_paid and b.due_date < datetime.now()]
-    if overdue_bills:
+    if unpaid.filter(Bill.due_date < now).limit(1).first():
         suggestions.append("Show me my overdue bills")
     
     # Check for upcoming bills
-    upcoming_bills = [b for b in bills if not b.is_paid and b.due_date >= datetime.now()]
-    if upcoming_bills:
+    if unpaid.filter(Bill.due_date >= now).limit(1).first():
         suggestions.append("What bills are due this week?")
     
     # Check for loans
-    loans = db.session.query(Bill, LoanDetails).join(
-        LoanDetails, Bill.id == LoanDetails.bill_id
-    ).filter(Bill.user_id == user_id).all()
+    has_loan = db.session.query(LoanDetails.id).join(
+        Bill, Bill.id == LoanDetails.bill_id
+    ).filter(Bill.user_id == user_id).limit(1).first()
     
-    if loans:
+    if has_loan:
         suggestions.append("Show my loan payment progress")
     
     # General suggestions
@@ -305,13 +511,44 @@ def get_suggestions():
         "What's my total monthly expense?"
     ])
     
-    return jsonify({'suggestions': suggestions[:5]}), 200  # Return top 5 suggestions
+    result = {'suggestions': suggestions[:5]}  # Return top 5 suggestions
+    
+    # Entries are kept in expiry order (the TTL is fixed), so expired ones sit at
+    # the front; past the size cap the oldest live entry goes too
+    now_ts = time.monotonic()
+    _suggestions_cache.pop(user_id, None)
+    while _suggestions_cache and (
+        len(_suggestions_cache) >= SUGGESTIONS_CACHE_MAX_SIZE
+        or next(iter(_suggestions_cache.values()))[0] <= now_ts
+    ):
+        _suggestions_cache.popitem(last=False)
+    _suggestions_cache[user_id] = (now_ts + SUGGESTIONS_CACHE_TTL, result)
+    
+    return jsonify(result), 200
+
+# Suggestions only change when a user's bills or loans do, so drop the cached
+# entry on those writes; the TTL covers bills becoming overdue over time
+@event.listens_for(Bill, 'after_insert')
+@event.listens_for(Bill, 'after_update')
+@event.listens_for(Bill, 'after_delete')
+def invalidate_bill_suggestions(mapper, connection, target):
+    _suggestions_cache.pop(target.user_id, None)
+
+@event.listens_for(LoanDetails, 'after_insert')
+@event.listens_for(LoanDetails, 'after_delete')
+def invalidate_loan_suggestions(mapper, connection, target):
+    user_id = connection.execute(
+        select(Bill.user_id).where(Bill.id == target.bill_id)
+    ).scalar()
+    _suggestions_cache.pop(user_id, None)
 
 # Helper functions
 
-async def get_ai_response(ai_provider: str, messages: list, user_id: str, context: dict) -> tuple:
-    """Get response from selected AI provider"""
-    preferences = ChatPreferences.query.filter_by(user_id=user_id).first()
+def get_ai_api_key(ai_provider: str, user_id: str) -> str:
+    """Get the user's decrypted API key for the selected AI provider"""
+    # Called while start_turn's user message is staged; don't flush it before the AI call
+    with db.session.no_autoflush:
+        preferences = ChatPreferences.query.filter_by(user_id=user_id).first()
     
     if not preferences:
         raise Exception("AI preferences not configured")
@@ -321,55 +558,144 @@ async def get_ai_response(ai_provider: str, messages: list, user_id: str, contex
             raise Exception("Gemini API key not configured")
         
         # Access the service instance from the app context
-        api_key = current_app.ai_service.decrypt_api_key(preferences.gemini_api_key)
-        return await current_app.ai_service.chat_with_gemini(messages, api_key, context)
+        return current_app.ai_service.decrypt_api_key(preferences.gemini_api_key)
     
     elif ai_provider == 'openai':
         if not preferences.openai_api_key:
             raise Exception("OpenAI API key not configured")
-
+        
         # Access the service instance from the app context
-        api_key = current_app.ai_service.decrypt_api_key(preferences.openai_api_key)
-        return await current_app.ai_service.chat_with_openai(messages, api_key, context)
+        return current_app.ai_service.decrypt_api_key(preferences.openai_api_key)
     
     else:
         raise Exception(f"Unknown AI provider: {ai_provider}")
 
-def get_user_context(user_id: str) -> dict:
-    """Get user's current data context for AI"""
-    context = {}
+async def get_ai_response(ai_provider: str, messages: list, api_key: str, context: dict) -> tuple:
+    """Get response from selected AI provider using a key resolved by the caller"""
+    if ai_provider == 'gemini':
+        return await current_app.ai_service.chat_with_gemini(messages, api_key, context)
     
-    # Get bills
-    bills = Bill.query.filter_by(user_id=user_id).all()
-    context['total_bills'] = len(bills)
-    context['unpaid_bills'] = len([b for b in bills if not b.is_paid])
+    return await current_app.ai_service.chat_with_openai(messages, api_key, context)
+
+async def update_session_summary(session_id: str, user_id: str, window_start: datetime, app):
+    """Fold messages that slid out of the history window into the session summary"""
+    try:
+        # DB reads and the commit go through worker threads so the AI loop never blocks on them
+        work = await asyncio.to_thread(_in_app_context, app, _pending_summary_work, session_id, user_id, window_start)
+        if not work:
+            return
+        encrypted_key, previous_summary, pending, summary_through = work
+        
+        api_key = app.ai_service.decrypt_api_key(encrypted_key)
+        summary = await app.ai_service.summarize_with_gemini(pending, api_key, previous_summary)
+        
+        if summary:
+            await asyncio.to_thread(_in_app_context, app, _save_session_summary, session_id, summary, summary_through)
+            logger.info(f"[CHATBOT] Session {session_id} summary updated through {summary_through}")
+    except Exception as e:
+        logger.error(f"[CHATBOT ERROR] Failed to update summary for session {session_id}: {str(e)}")
+
+def _pending_summary_work(session_id: str, user_id: str, window_start: datetime):
+    """Encrypted key, current summary and the (role, content) pairs still to summarize, or None"""
+    session = db.session.get(ChatSession, session_id)
+    preferences = ChatPreferences.query.filter_by(user_id=user_id).first()
     
-    # Get upcoming payments
+    if not session or not preferences or not preferences.gemini_api_key:
+        return None
+    
+    query = ChatMessage.query.filter(
+        ChatMessage.session_id == session_id,
+        ChatMessage.timestamp < window_start
+    )
+    if session.summary_through:
+        query = query.filter(ChatMessage.timestamp > session.summary_through)
+    pending = query.order_by(ChatMessage.timestamp).all()
+    
+    if not pending:
+        return None
+    
+    return (
+        preferences.gemini_api_key,
+        session.summary,
+        [(msg.role, msg.content) for msg in pending],
+        pending[-1].timestamp
+    )
+
+def _save_session_summary(session_id: str, summary: str, summary_through: datetime):
+    """Store the new rolling summary"""
+    try:
+        session = db.session.get(ChatSession, session_id)
+        if session:
+            session.summary = summary
+            session.summary_through = summary_through
+            db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+async def get_user_context(user_id: str, app) -> dict:
+    """Get user's current data context for AI, running the lookups concurrently"""
+    counts, upcoming, loans = await asyncio.gather(
+        asyncio.to_thread(_in_app_context, app, _bills_counts, user_id),
+        asyncio.to_thread(_in_app_context, app, _upcoming_payments, user_id),
+        asyncio.to_thread(_in_app_context, app, _loans_summary, user_id)
+    )
+    
+    context = dict(counts)
+    context['upcoming_payments'] = upcoming
+    context.update(loans)
+    return context
+
+def _in_app_context(app, func, *args):
+    """Run func in its own app context (and so its own DB session) on a worker thread"""
+    with app.app_context():
+        return func(*args)
+
+def _bills_counts(user_id: str) -> dict:
+    """Total and unpaid bill counts"""
+    return {
+        'total_bills': db.session.query(func.count(Bill.id)).filter(
+            Bill.user_id == user_id
+        ).scalar(),
+        'unpaid_bills': db.session.query(func.count(Bill.id)).filter(
+            Bill.user_id == user_id,
+            Bill.is_paid == False
+        ).scalar()
+    }
+
+def _upcoming_payments(user_id: str) -> list:
+    """Unpaid bills due within the next week"""
     upcoming = Bill.query.filter(
         Bill.user_id == user_id,
         Bill.is_paid == False,
         Bill.due_date <= datetime.now() + timedelta(days=7)
     ).all()
     
-    context['upcoming_payments'] = [
+    return [
         {
             'name': b.name,
             'amount': b.amount,
-            'due_date': b.due_date.strftime('%Y-%m-%d')
+            'due_date': b.due_date.date().isoformat()
         }
         for b in upcoming
     ]
-    
-    # Get loan summary
-    loans = db.session.query(Bill, LoanDetails).join(
-        LoanDetails, Bill.id == LoanDetails.bill_id
-    ).filter(Bill.user_id == user_id, LoanDetails.is_active == True).all()
-    
-    if loans:
-        context['active_loans'] = len(loans)
-        context['total_debt'] = sum(loan.amount_remaining for _, loan in loans)
-    
-    return context
+
+def _loans_summary(user_id: str) -> dict:
+    """Active loan count and outstanding debt, if the user has any loans"""
+    active_loans, total_debt = db.session.query(
+        func.count(LoanDetails.id),
+        func.coalesce(func.sum(LoanDetails.amount_remaining), 0)
+    ).join(
+        Bill, Bill.id == LoanDetails.bill_id
+    ).filter(Bill.user_id == user_id, LoanDetails.is_active == True).one()
+    
+    if not active_loans:
+        return {}
+    
+    return {
+        'active_loans': active_loans,
+        'total_debt': total_debt
+    }
 
 def execute_function_call(function_call: dict, user_id: str) -> dict:
     """Execute the function requested by AI"""
@@ -386,7 +712,7 @@ def execute_function_call(function_call: dict, user_id: str) -> dict:
                     'id': b.id,
                     'name': b.name,
                     'amount': b.amount,
-                    'due_date': b.due_date.strftime('%Y-%m-%d'),
+                    'due_date': b.due_date.date().isoformat(),
                     'is_paid': b.is_paid,
                     'category': b.category,
                     'frequency': b.frequency
@@ -397,10 +723,12 @@ def execute_function_call(function_call: dict, user_id: str) -> dict:
     
     elif func_name == 'get_upcoming_payments':
         days = args.get('days', 7)
+        now = datetime.now()
+        today = now.date()
         upcoming = Bill.query.filter(
             Bill.user_id == user_id,
             Bill.is_paid == False,
-            Bill.due_date <= datetime.now() + timedelta(days=days)
+            Bill.due_date <= now + timedelta(days=days)
         ).all()
         
         return {
@@ -408,8 +736,8 @@ def execute_function_call(function_call: dict, user_id: str) -> dict:
                 {
                     'name': b.name,
                     'amount': b.amount,
-                    'due_date': b.due_date.strftime('%Y-%m-%d'),
-                    'days_until_due': (b.due_date.date() - datetime.now().date()).days
+                    'due_date': b.due_date.date().isoformat(),
+                    'days_until_due': (b.due_date.date() - today).days
                 }
                 for b in upcoming
             ]
@@ -456,8 +784,10 @@ def execute_function_call(function_call: dict, user_id: str) -> dict:
                 frequency=args['frequency'],
                 notes='Created via chatbot'
             )
-            db.session.add(bill)
-            db.session.commit()
+            # Flush inside a savepoint to get bill.id; the bill is committed with
+            # the chat turn, and a failed insert only rolls back the savepoint
+            with db.session.begin_nested():
+                db.session.add(bill)
             
             return {
                 'success': True,
@@ -483,7 +813,7 @@ def execute_function_call(function_call: dict, user_id: str) -> dict:
             'id': bill.id,
             'name': bill.name,
             'amount': bill.amount,
-            'due_date': bill.due_date.strftime('%Y-%m-%d'),
+            'due_date': bill.due_date.date().isoformat(),
             'category': bill.category,
             'frequency': bill.frequency,
             'is_paid': bill.is_paid,
@@ -518,26 +848,26 @@ def format_function_response(func_name: str, response: dict, ai_text: str) -> st
         unpaid = [b for b in bills if not b['is_paid']]
         paid = [b for b in bills if b['is_paid']]
         
-        result = f"You have {len(bills)} bills in total.\n\n"
+        parts = [f"You have {len(bills)} bills in total.\n\n"]
         
         if unpaid:
-            result += f"📋 *Unpaid Bills ({len(unpaid)}):*\n"
+            parts.append(f"📋 *Unpaid Bills ({len(unpaid)}):*\n")
             for bill in unpaid:
-                result += f"• {bill['name']}: ₹{bill['amount']} due on {bill['due_date']}\n"
+                parts.append(f"• {bill['name']}: ₹{bill['amount']} due on {bill['due_date']}\n")
         
         if paid:
-            result += f"\n✅ *Paid Bills ({len(paid)}):*\n"
+            parts.append(f"\n✅ *Paid Bills ({len(paid)}):*\n")
             for bill in paid[:3]:  # Show only first 3
-                result += f"• {bill['name']}: ₹{bill['amount']}\n"
+                parts.append(f"• {bill['name']}: ₹{bill['amount']}\n")
         
-        return result
+        return "".join(parts)
     
     elif func_name == 'get_upcoming_payments':
         upcoming = response.get('upcoming', [])
         if not upcoming:
             return "Great! You don't have any payments due in the specified period."
         
-        result = f"You have {len(upcoming)} upcoming payments:\n\n"
+        parts = [f"You have {len(upcoming)} upcoming payments:\n\n"]
         total = 0
         
         for bill in upcoming:
@@ -549,26 +879,26 @@ def format_function_response(func_name: str, response: dict, ai_text: str) -> st
             else:
                 when = f"in {days} days"
             
-            result += f"• {bill['name']}: ₹{bill['amount']} due {when}\n"
+            parts.append(f"• {bill['name']}: ₹{bill['amount']} due {when}\n")
             total += bill['amount']
         
-        result += f"\n💰 Total amount due: ₹{total}"
-        return result
+        parts.append(f"\n💰 Total amount due: ₹{total}")
+        return "".join(parts)
     
     elif func_name == 'get_loan_summary':
         loans = response.get('active_loans', [])
         if not loans:
             return "You don't have any active loans or EMIs."
         
-        result = f"📊 *Loan/EMI Summary:*\n\n"
+        parts = ["📊 *Loan/EMI Summary:*\n\n"]
         
         for loan in loans:
-            result += f"{loan['bill_name']}\n"
-            result += f"• Progress: {loan['installments_paid']}/{loan['total_installments']} installments ({loan['progress_percentage']}%)\n"
-            result += f"• Remaining: ₹{loan['amount_remaining']}\n\n"
+            parts.append(f"{loan['bill_name']}\n")
+            parts.append(f"• Progress: {loan['installments_paid']}/{loan['total_installments']} installments ({loan['progress_percentage']}%)\n")
+            parts.append(f"• Remaining: ₹{loan['amount_remaining']}\n\n")
         
-        result += f"💳 *Total Outstanding Debt:* ₹{response['total_debt']}"
-        return result
+        parts.append(f"💳 *Total Outstanding Debt:* ₹{response['total_debt']}")
+        return "".join(parts)
     
     elif func_name == 'create_bill':
         if response.get('success'):
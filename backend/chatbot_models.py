@@ -1,36 +1,53 @@
 # chatbot_models.py - Database models for chatbot functionality
 
-from models import db, User
+from models import db, User, new_id, UUID_KEY
+from sqlalchemy.dialects.postgresql import JSONB
 from datetime import datetime
-import uuid
 import logging
 
-logging.basicConfig(level=logging.DEBUG)
+# Chat keys share models.UUID_KEY: native UUID on PostgreSQL, String(36) elsewhere.
+
 logger = logging.getLogger(__name__)
 
 class ChatSession(db.Model):
-    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-    user_id = db.Column(db.String(36), db.ForeignKey('user.id'), nullable=False)
+    id = db.Column(UUID_KEY, primary_key=True, default=new_id)
+    user_id = db.Column(UUID_KEY, db.ForeignKey('user.id'), nullable=False)
     ai_provider = db.Column(db.String(50), default='gemini')
     is_active = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Rolling summary of messages that have slid out of the AI history window
+    summary = db.Column(db.Text)
+    summary_through = db.Column(db.DateTime)
     
     user = db.relationship('User', backref='chat_sessions')
+    
+    __table_args__ = (
+        # Serves the per-request session ownership check
+        db.Index('ix_chat_session_user_active', 'user_id', 'is_active'),
+    )
 
 class ChatMessage(db.Model):
-    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-    session_id = db.Column(db.String(36), db.ForeignKey('chat_session.id'), nullable=False)
+    id = db.Column(UUID_KEY, primary_key=True, default=new_id)
+    session_id = db.Column(UUID_KEY, db.ForeignKey('chat_session.id'), nullable=False)
     role = db.Column(db.String(20), nullable=False) # 'user', 'assistant', 'system'
     content = db.Column(db.Text, nullable=False)
-    function_call = db.Column(db.Text)
-    function_response = db.Column(db.Text)
+    # Stored as JSONB on PostgreSQL and as JSON text elsewhere; SQLAlchemy
+    # handles (de)serialization
+    function_call = db.Column(db.JSON().with_variant(JSONB, 'postgresql'))
+    function_response = db.Column(db.JSON().with_variant(JSONB, 'postgresql'))
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
     
     session = db.relationship('ChatSession', backref='messages')
+    
+    __table_args__ = (
+        # Serves history loads and keyset pagination of a session by timestamp;
+        # its session_id prefix also covers plain session_id lookups
+        db.Index('ix_chat_message_session_timestamp', 'session_id', 'timestamp', 'id'),
+    )
 
 class ChatPreferences(db.Model):
-    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-    user_id = db.Column(db.String(36), db.ForeignKey('user.id'), nullable=False, unique=True)
+    id = db.Column(UUID_KEY, primary_key=True, default=new_id)
+    user_id = db.Column(UUID_KEY, db.ForeignKey('user.id'), nullable=False, unique=True)
     preferred_ai = db.Column(db.String(50), default='gemini')
     language = db.Column(db.String(10), default='en-US')
     enable_voice = db.Column(db.Boolean, default=False)
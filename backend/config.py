@@ -12,6 +12,17 @@ class Config:
     SECRET_KEY = os.getenv('SECRET_KEY', 'your-secret-key-here')
     SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL', 'sqlite:///bills_reminder.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Drop dead connections before use and recycle them before server-side idle timeouts
+    SQLALCHEMY_ENGINE_OPTIONS = {'pool_pre_ping': True, 'pool_recycle': 1800}
+    if not SQLALCHEMY_DATABASE_URI.startswith('sqlite'):
+        # Sized for the worker count; SQLite keeps the pool SQLAlchemy picks for it
+        SQLALCHEMY_ENGINE_OPTIONS.update(
+            pool_size=int(os.getenv('DB_POOL_SIZE', 10)),
+            max_overflow=int(os.getenv('DB_MAX_OVERFLOW', 20))
+        )
+    
+    # Root log level configured in app.py (unknown names fall back to WARNING); DEBUG/INFO for development
+    LOG_LEVEL = os.getenv('LOG_LEVEL', 'WARNING').upper()
     
     # JWT
     JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY', 'your-jwt-secret-key')
@@ -26,6 +37,16 @@ class Config:
     # Add the missing OpenAI API Key
     OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
     
+    # Maximum number of Gemini requests in flight at once
+    GEMINI_MAX_CONCURRENCY = int(os.getenv('GEMINI_MAX_CONCURRENCY', 8))
+    
+    # Seconds a request thread waits for an AI reply before giving up
+    AI_REQUEST_TIMEOUT = int(os.getenv('AI_REQUEST_TIMEOUT', 60))
+    
+    # Response compression (Flask-Compress); small bodies aren't worth it
+    COMPRESS_ALGORITHM = ['br', 'gzip']
+    COMPRESS_MIN_SIZE = 500
+    
     # Local Storage Settings
     UPLOAD_FOLDER = os.getenv('UPLOAD_FOLDER', 'uploads/receipts')
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
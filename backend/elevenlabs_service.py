@@ -7,8 +7,6 @@ from dotenv import load_dotenv
 import logging
 
 
-# Configure logging
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
 # Load environment variables from a .env file
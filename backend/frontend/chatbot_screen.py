@@ -7,139 +7,134 @@ from kivy.uix.button import Button
 from kivy.uix.textinput import TextInput
 from kivy.uix.scrollview import ScrollView
 from kivy.uix.popup import Popup
+from kivy.uix.recycleview.views import RecycleDataViewBehavior
+from kivy.core.text.markup import MarkupLabel as CoreMarkupLabel
 from kivy.properties import StringProperty, ListProperty, BooleanProperty, ObjectProperty, NumericProperty
 from kivy.lang import Builder
 
 from kivy.clock import Clock
-from kivy.metrics import dp
+from kivy.metrics import dp, sp
 from kivy.app import App
 from kivy.animation import Animation
-from functools import partial
-import threading
-import json
+from concurrent.futures import ThreadPoolExecutor
+
+# Bubble styling shared by every ChatMessage and the <ChatMessage> kv rule.
+# dp() is evaluated once here rather than per message; the display density
+# is fixed for the lifetime of the app.
+_DP5 = dp(5)
+_DP9 = dp(9)
+_DP10 = dp(10)
+_DP12 = dp(12)
+_DP15 = dp(15)
+_DP230 = dp(230)
+_SP15 = sp(15)
+_USER_RGBA = (0.86, 0.97, 0.78, 1)  # WhatsApp user green
+_BOT_RGBA = (1, 1, 1, 1)  # White for bot
+_TXT_COLOR = (0.1, 0.1, 0.1, 1)
+_TS_COLOR = (0.5, 0.5, 0.5, 1)
+# bubble.png is a white rounded rectangle with 12px corners; Color tints it
+_BUBBLE_BORDER = (12, 12, 12, 12)
+_BUBBLE_DISPLAY_BORDER = [_DP12] * 4
+# Label wrap width and the height a bubble adds around its text
+_BUBBLE_WRAP_WIDTH = _DP230 - 2 * _DP10
+_BUBBLE_CHROME_HEIGHT = 2 * _DP10 + _DP15 + 2 * _DP5
+
+_WELCOME_TEXT = (
+    "Hello! I'm your AI assistant for managing bills and reminders. I can help you:\n\n"
+    "• Check your upcoming bills\n"
+    "• Add new reminders\n"
+    "• Track loan payments\n"
+    "• Analyze spending patterns\n\n"
+    "How can I assist you today?"
+)
+
+# Replies longer than this are rendered paragraph by paragraph
+_CHUNKED_REPLY_CHARS = 1500
+
+# Shared workers for the screen's blocking API calls
+_IO_POOL = ThreadPoolExecutor(max_workers=4, thread_name_prefix='chat-io')
 
 # Kivy will automatically load the new <SuggestionButton> rule from the .kv file.
 # We just need a placeholder class here for Kivy to recognize it.
 class SuggestionButton(Button):
     pass
 
-class ChatMessage(BoxLayout):
-    """Individual chat message widget"""
+def measure_message_height(text):
+    """Height a ChatMessage needs for text, computed without building the widget.
+    Mirrors the bubble layout: label wrapped at dp(230) with dp(10) padding,
+    a dp(15) timestamp row and dp(5) padding around the message."""
+    label = CoreMarkupLabel(
+        text=text,
+        text_size=(_BUBBLE_WRAP_WIDTH, None),
+        font_size=_SP15,
+        halign='left',
+        valign='top'
+    )
+    label.refresh()
+    return label.texture.size[1] + _BUBBLE_CHROME_HEIGHT
+
+class ChatMessage(RecycleDataViewBehavior, BoxLayout):
+    """Individual chat message widget, reused by the chat RecycleView.
+    The bubble itself is built by the <ChatMessage> rule in chatbot_screen.kv."""
     message_text = StringProperty('')
     is_user = BooleanProperty(True)
 
-    def __init__(self, message_text='', is_user=True, **kwargs):
-        super().__init__(**kwargs)
-        self.message_text = message_text
-        self.is_user = is_user
-        self.orientation = 'horizontal'
-        self.size_hint_y = None
-        self.padding = dp(5)
-        self.spacing = dp(5)
-        self.height = self.minimum_height # Set initial height
-
-        # Create message bubble
-        self.create_message_bubble()
-
-    def create_message_bubble(self):
-        """Create the message bubble based on sender"""
-        if self.is_user:
-            self.add_widget(BoxLayout(size_hint_x=0.3))
-
-        msg_container = BoxLayout(
-            orientation='vertical',
-            size_hint_x=0.7,
-            size_hint_y=None
-        )
-        msg_container.bind(minimum_height=msg_container.setter('height'))
-
-
-        msg_label = Label(
-            text=self.message_text,
-            size_hint_y=None,
-            text_size=(dp(230), None), # Reduced width to account for padding
-            halign='left',
-            valign='top',
-            markup=True,
-            color=(0.1, 0.1, 0.1, 1),
-            padding=(dp(10), dp(10))
-        )
-        msg_label.bind(texture_size=msg_label.setter('size'))
-
-        msg_box = BoxLayout(
-            size_hint_y=None,
-            padding=(0, 0)
-        )
-        msg_label.bind(height=lambda instance, value: setattr(msg_box, 'height', value))
-
-
-        with msg_box.canvas.before:
-            from kivy.graphics import Color, RoundedRectangle
-
-            if self.is_user:
-                Color(0.86, 0.97, 0.78, 1)  # WhatsApp user green
-            else:
-                Color(1, 1, 1, 1)  # White for bot
-
-            self.bg_rect = RoundedRectangle(
-                pos=msg_box.pos,
-                size=msg_box.size,
-                radius=[dp(12)]
-            )
-            msg_box.bind(pos=self.update_bg, size=self.update_bg)
-
-        msg_box.add_widget(msg_label)
-        msg_container.add_widget(msg_box)
-
-        timestamp = Label(
-            text='Just now',
-            size_hint_y=None,
-            height=dp(15),
-            font_size=dp(9),
-            color=(0.5, 0.5, 0.5, 1),
-            halign='right' if self.is_user else 'left'
-        )
-        msg_container.add_widget(timestamp)
-
-        self.add_widget(msg_container)
-
-        if not self.is_user:
-            self.add_widget(BoxLayout(size_hint_x=0.3))
-
-        msg_container.bind(height=self.setter('height'))
-
-    def update_bg(self, instance, value):
-        self.bg_rect.pos = instance.pos
-        self.bg_rect.size = instance.size
-
 class ChatbotScreen(Screen):
     """Chatbot screen for AI-powered bill assistance"""
     session_id = StringProperty('')
     current_ai = StringProperty('gemini')
     messages = ListProperty([])
+    _typing = None
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        # A pending trigger is not re-armed, so bursts of messages scroll once
+        self._scroll_trigger = Clock.create_trigger(self._do_scroll_bottom, 0.1)
+        # Back-to-back requests for suggestions share one fetch
+        self._suggestions_trigger = Clock.create_trigger(self._do_load_suggestions, 0.5)
+        self._suggestions_cache = None
+        self._suggestion_btns = []
+        # Popups are created on first use and reused afterwards
+        self._provider_popup = None
+        self._api_key_popup = None
+        self._error_popup = None
+
+    def _do_scroll_bottom(self, *args):
+        self.ids.chat_scroll.scroll_y = 0
 
     def on_enter(self):
-        self.ids.chat_container.clear_widgets()
-        self.setup_chat()
-        self.load_preferences()
+        # The running App never changes while the screen exists
+        self._app = App.get_running_app()
+        self.messages = []
+        # One worker issues the three startup requests back to back and the
+        # results are applied together in a single frame
+        _IO_POOL.submit(self._run_fetches, self._fetch_session, self._fetch_preferences, self._fetch_suggestions)
         self.show_welcome_message()
-        self.load_suggestions()
 
-    def setup_chat(self):
-        app = App.get_running_app()
+    def _run_fetches(self, *fetchers):
+        """Run blocking fetchers in order, then apply their UI updates in one Clock callback"""
+        updates = [update for update in (fetch() for fetch in fetchers) if update]
+        if not updates:
+            return
+
+        def apply_updates(dt):
+            for update in updates:
+                update()
 
-        def create_session():
-            try:
-                response = app.api.create_chat_session(self.current_ai)
-                if response and response.status_code == 201:
-                    data = response.json()
-                    Clock.schedule_once(lambda dt: self.on_session_created(data), 0)
-                else:
-                    Clock.schedule_once(lambda dt: self.show_error("Failed to start chat"), 0)
-            except Exception as e:
-                Clock.schedule_once(lambda dt, err=str(e): self.show_error(err), 0)
+        Clock.schedule_once(apply_updates, 0)
 
-        threading.Thread(target=create_session).start()
+    def setup_chat(self):
+        _IO_POOL.submit(self._run_fetches, self._fetch_session)
+
+    def _fetch_session(self):
+        try:
+            response = self._app.api.create_chat_session(self.current_ai)
+            if response and response.status_code == 201:
+                data = response.json()
+                return lambda: self.on_session_created(data)
+            return lambda: self.show_error("Failed to start chat")
+        except Exception as e:
+            return lambda err=str(e): self.show_error(err)
 
     def on_session_created(self, data):
         self.session_id = data.get('session_id', '')
@@ -147,18 +142,16 @@ class ChatbotScreen(Screen):
         self.ids.ai_provider_label.text = f"AI: {self.current_ai.title()}"
 
     def load_preferences(self):
-        app = App.get_running_app()
+        _IO_POOL.submit(self._run_fetches, self._fetch_preferences)
 
-        def get_preferences():
-            try:
-                response = app.api.get_chat_preferences()
-                if response and response.status_code == 200:
-                    data = response.json()
-                    Clock.schedule_once(lambda dt: self.on_preferences_loaded(data), 0)
-            except Exception as e:
-                print(f"Failed to load preferences: {e}")
-
-        threading.Thread(target=get_preferences).start()
+    def _fetch_preferences(self):
+        try:
+            response = self._app.api.get_chat_preferences()
+            if response and response.status_code == 200:
+                data = response.json()
+                return lambda: self.on_preferences_loaded(data)
+        except Exception as e:
+            print(f"Failed to load preferences: {e}")
 
     def on_preferences_loaded(self, data):
         self.current_ai = data.get('preferred_ai', 'gemini')
@@ -170,47 +163,51 @@ class ChatbotScreen(Screen):
 
     def show_welcome_message(self):
         def add_welcome_delayed(dt):
-            welcome_msg = ChatMessage(
-                message_text="Hello! I'm your AI assistant for managing bills and reminders. I can help you:\n\n" +
-                             "• Check your upcoming bills\n" +
-                             "• Add new reminders\n" +
-                             "• Track loan payments\n" +
-                             "• Analyze spending patterns\n\n" +
-                             "How can I assist you today?",
-                is_user=False
-            )
-            self.ids.chat_container.add_widget(welcome_msg)
-
-            def fix_scroll(dt2):
-                self.ids.chat_scroll.scroll_y = 0
-
-            Clock.schedule_once(fix_scroll, 0.1)
+            self.add_message(_WELCOME_TEXT, is_user=False)
+            self._scroll_trigger()
 
         Clock.schedule_once(add_welcome_delayed, 0.2)
 
     def load_suggestions(self):
-        app = App.get_running_app()
+        self._suggestions_trigger()
 
-        def get_suggestions():
-            try:
-                response = app.api.get_chat_suggestions()
-                if response and response.status_code == 200:
-                    suggestions = response.json().get('suggestions', [])
-                    Clock.schedule_once(lambda dt: self.on_suggestions_loaded(suggestions), 0)
-            except Exception as e:
-                print(f"Failed to load suggestions: {e}")
+    def _do_load_suggestions(self, *args):
+        _IO_POOL.submit(self._run_fetches, self._fetch_suggestions)
 
-        threading.Thread(target=get_suggestions).start()
+    def _fetch_suggestions(self):
+        try:
+            response = self._app.api.get_chat_suggestions()
+            if response and response.status_code == 200:
+                suggestions = response.json().get('suggestions', [])
+                return lambda: self.on_suggestions_loaded(suggestions)
+        except Exception as e:
+            print(f"Failed to load suggestions: {e}")
 
-    # *** MODIFIED METHOD ***
     def on_suggestions_loaded(self, suggestions):
-        self.ids.suggestions_box.clear_widgets()
-        for suggestion in suggestions:
-            # Create an instance of our new custom button.
-            # All styling is now handled by the <SuggestionButton> rule in the .kv file.
-            btn = SuggestionButton(text=suggestion)
-            btn.bind(on_release=partial(self.send_suggestion, suggestion))
-            self.ids.suggestions_box.add_widget(btn)
+        if suggestions == self._suggestions_cache:
+            return
+        self._suggestions_cache = suggestions
+
+        # Reuse the existing buttons; only their text changes between loads
+        box = self.ids.suggestions_box
+        for i, suggestion in enumerate(suggestions):
+            if i < len(self._suggestion_btns):
+                self._suggestion_btns[i].text = suggestion
+            else:
+                # All styling is handled by the <SuggestionButton> rule in the .kv file.
+                btn = SuggestionButton(text=suggestion)
+                # Kivy keeps bound methods as weak references, so the button
+                # does not keep the screen alive and no per-text partial is needed
+                btn.bind(on_release=self.on_suggestion_release)
+                self._suggestion_btns.append(btn)
+                box.add_widget(btn)
+
+        for btn in self._suggestion_btns[len(suggestions):]:
+            box.remove_widget(btn)
+        del self._suggestion_btns[len(suggestions):]
+
+    def on_suggestion_release(self, btn):
+        self.send_suggestion(btn.text)
 
     def send_suggestion(self, suggestion_text, *args):
         self.ids.message_input.text = suggestion_text
@@ -228,16 +225,15 @@ class ChatbotScreen(Screen):
 
         self.ids.message_input.text = ''
 
-        user_msg = ChatMessage(message_text=message_text, is_user=True)
-        self.ids.chat_container.add_widget(user_msg)
-        self.ids.chat_scroll.scroll_y = 0
+        self.add_message(message_text, is_user=True)
+        self._scroll_trigger()
 
         self.show_typing_indicator()
 
-        app = App.get_running_app()
-        app.api.send_chat_message(self.session_id, message_text, self.on_response_received)
+        self._app.api.send_chat_message(self.session_id, message_text, self.on_response_received)
 
-    def on_response_received(self, response, error=None):
+    def on_response_received(self, response, error=None, data=None):
+        # data is the JSON body, already decoded by the API worker thread
         self.hide_typing_indicator()
 
         if error:
@@ -245,123 +241,157 @@ class ChatbotScreen(Screen):
             return
 
         if response and response.status_code == 200:
-            try:
-                data = response.json()
-                response_text = data.get('response', 'Sorry, I couldn\'t process that.')
-                bot_msg = ChatMessage(message_text=response_text, is_user=False)
-                self.ids.chat_container.add_widget(bot_msg)
-
-                def fix_scroll(dt):
-                    self.ids.chat_scroll.scroll_y = 0
+            if data is None:
+                self.show_error("Failed to parse server response.")
+                return
 
-                Clock.schedule_once(fix_scroll, 0.1)
+            response_text = data.get('response', 'Sorry, I couldn\'t process that.')
+            self.add_reply(response_text)
 
-                if data.get('function_executed'):
-                    self.load_suggestions()
-            except json.JSONDecodeError:
-                self.show_error("Failed to parse server response.")
+            if data.get('function_executed'):
+                self.load_suggestions()
+        elif isinstance(data, dict):
+            error_message = data.get('message', 'Failed to get a valid response from the server.')
+            self.show_error(error_message)
         else:
-            try:
-                error_data = response.json()
-                error_message = error_data.get('message', 'Failed to get a valid response from the server.')
-                self.show_error(error_message)
-            except (json.JSONDecodeError, AttributeError):
-                self.show_error("An unknown error occurred.")
+            self.show_error("An unknown error occurred.")
+
+    def add_message(self, text, is_user):
+        """Append a message to the chat; the RecycleView renders it from self.messages"""
+        item = {
+            'message_text': text,
+            'is_user': is_user,
+            'height': measure_message_height(text)
+        }
+        self.messages.append(item)
+        return item
+
+    def add_reply(self, text):
+        """Add a bot reply; long replies are added one paragraph per frame so
+        no single frame has to measure and lay out the whole text"""
+        paragraphs = [p for p in text.split('\n\n') if p.strip()]
+        if len(text) < _CHUNKED_REPLY_CHARS or len(paragraphs) < 2:
+            self.add_message(text, is_user=False)
+            self._scroll_trigger()
+            return
+
+        chunks = iter(paragraphs)
+
+        def add_next(dt):
+            paragraph = next(chunks, None)
+            if paragraph is None:
+                self._scroll_trigger()
+                return False
+            self.add_message(paragraph, is_user=False)
+
+        Clock.schedule_interval(add_next, 0)
 
     def show_typing_indicator(self):
-        if not hasattr(self, 'typing_indicator'):
-            self.typing_indicator = ChatMessage(
-                message_text="AI is typing...",
-                is_user=False
-            )
-            self.ids.chat_container.add_widget(self.typing_indicator)
+        if self._typing is None:
+            # Built and measured once, then re-used for every round-trip
+            self._typing = {
+                'message_text': "AI is typing...",
+                'is_user': False,
+                'height': measure_message_height("AI is typing...")
+            }
+        if not any(item is self._typing for item in self.messages):
+            self.messages.append(self._typing)
 
     def hide_typing_indicator(self):
-        if hasattr(self, 'typing_indicator') and self.typing_indicator in self.ids.chat_container.children:
-            self.ids.chat_container.remove_widget(self.typing_indicator)
-            del self.typing_indicator
+        # The indicator is normally the last entry, so search from the end
+        for i in range(len(self.messages) - 1, -1, -1):
+            if self.messages[i] is self._typing:
+                del self.messages[i]
+                break
 
     def switch_ai_provider(self):
-        content = BoxLayout(orientation='vertical', spacing=dp(20), padding=dp(20))
-
-        content.add_widget(Label(
-            text='Select AI Provider:',
-            size_hint_y=None,
-            height=dp(30)
-        ))
-
-        gemini_btn = Button(
-            text='Google Gemini',
-            size_hint_y=None,
-            height=dp(50),
-            background_color=(0.26, 0.38, 0.89, 1) if self.current_ai == 'gemini' else (0.3, 0.3, 0.3, 1)
-        )
-        gemini_btn.bind(on_release=lambda x: self.select_ai('gemini', popup))
-        content.add_widget(gemini_btn)
-
-        openai_btn = Button(
-            text='OpenAI GPT-4',
-            size_hint_y=None,
-            height=dp(50),
-            background_color=(0.26, 0.38, 0.89, 1) if self.current_ai == 'openai' else (0.3, 0.3, 0.3, 1)
-        )
-        openai_btn.bind(on_release=lambda x: self.select_ai('openai', popup))
-        content.add_widget(openai_btn)
-
-        popup = Popup(
-            title='Choose AI Assistant',
-            content=content,
-            size_hint=(0.8, 0.4)
-        )
-        popup.open()
+        # Built on first use, then only the highlight changes between opens
+        if self._provider_popup is None:
+            content = BoxLayout(orientation='vertical', spacing=dp(20), padding=dp(20))
+
+            content.add_widget(Label(
+                text='Select AI Provider:',
+                size_hint_y=None,
+                height=dp(30)
+            ))
+
+            popup = Popup(
+                title='Choose AI Assistant',
+                content=content,
+                size_hint=(0.8, 0.4)
+            )
+
+            self._provider_btns = {}
+            for provider, text in (('gemini', 'Google Gemini'), ('openai', 'OpenAI GPT-4')):
+                btn = Button(
+                    text=text,
+                    size_hint_y=None,
+                    height=dp(50)
+                )
+                btn.bind(on_release=lambda x, p=provider: self.select_ai(p, popup))
+                content.add_widget(btn)
+                self._provider_btns[provider] = btn
+
+            self._provider_popup = popup
+
+        for provider, btn in self._provider_btns.items():
+            btn.background_color = (0.26, 0.38, 0.89, 1) if self.current_ai == provider else (0.3, 0.3, 0.3, 1)
+
+        self._provider_popup.open()
 
     def select_ai(self, provider, popup):
         popup.dismiss()
         self.current_ai = provider
 
-        app = App.get_running_app()
-        app.api.update_chat_preferences({'preferred_ai': provider}, lambda r, e=None: None)
+        self._app.api.update_chat_preferences({'preferred_ai': provider}, lambda r, e=None: None)
 
         self.ids.ai_provider_label.text = f"AI: {provider.title()}"
 
         self.setup_chat()
 
     def show_api_key_prompt(self, provider):
-        content = BoxLayout(orientation='vertical', spacing=dp(15), padding=dp(15))
+        if self._api_key_popup is None:
+            content = BoxLayout(orientation='vertical', spacing=dp(15), padding=dp(15))
+
+            self._api_key_label = Label(
+                size_hint_y=None,
+                height=dp(30)
+            )
+            content.add_widget(self._api_key_label)
+
+            self._api_key_input = TextInput(
+                multiline=False,
+                password=True,
+                size_hint_y=None,
+                height=dp(40)
+            )
+            content.add_widget(self._api_key_input)
 
-        content.add_widget(Label(
-            text=f'Please enter your {provider} API key:',
-            size_hint_y=None,
-            height=dp(30)
-        ))
+            btn_box = BoxLayout(size_hint_y=None, height=dp(50), spacing=dp(10))
 
-        api_input = TextInput(
-            multiline=False,
-            password=True,
-            size_hint_y=None,
-            height=dp(40)
-        )
-        content.add_widget(api_input)
+            save_btn = Button(text='Save')
+            cancel_btn = Button(text='Cancel')
 
-        btn_box = BoxLayout(size_hint_y=None, height=dp(50), spacing=dp(10))
+            btn_box.add_widget(cancel_btn)
+            btn_box.add_widget(save_btn)
+            content.add_widget(btn_box)
 
-        save_btn = Button(text='Save')
-        cancel_btn = Button(text='Cancel')
+            popup = Popup(
+                content=content,
+                size_hint=(0.9, 0.4)
+            )
 
-        btn_box.add_widget(cancel_btn)
-        btn_box.add_widget(save_btn)
-        content.add_widget(btn_box)
+            save_btn.bind(on_release=lambda x: self.save_api_key(self._api_key_provider, self._api_key_input.text, popup))
+            cancel_btn.bind(on_release=popup.dismiss)
 
-        popup = Popup(
-            title=f'{provider} API Key Required',
-            content=content,
-            size_hint=(0.9, 0.4)
-        )
+            self._api_key_popup = popup
 
-        save_btn.bind(on_release=lambda x: self.save_api_key(provider, api_input.text, popup))
-        cancel_btn.bind(on_release=popup.dismiss)
+        self._api_key_provider = provider
+        self._api_key_label.text = f'Please enter your {provider} API key:'
+        self._api_key_input.text = ''
+        self._api_key_popup.title = f'{provider} API Key Required'
 
-        popup.open()
+        self._api_key_popup.open()
 
     def save_api_key(self, provider, api_key, popup):
         popup.dismiss()
@@ -370,23 +400,33 @@ class ChatbotScreen(Screen):
             self.show_error("API key cannot be empty")
             return
 
-        app = App.get_running_app()
-
         key_field = 'gemini_api_key' if provider == 'Gemini' else 'openai_api_key'
-        app.api.update_chat_preferences({key_field: api_key}, lambda r, e=None: None)
+        self._app.api.update_chat_preferences({key_field: api_key}, lambda r, e=None: None)
 
         self.setup_chat()
 
     def clear_chat(self):
-        self.ids.chat_container.clear_widgets()
-        self.setup_chat()
+        self.messages = []
+        if self.session_id:
+            # Keep a session the server still knows; only replace one that's gone
+            _IO_POOL.submit(self._run_fetches, self._check_session)
+        else:
+            self.setup_chat()
         self.show_welcome_message()
         self.load_suggestions()
 
+    def _check_session(self):
+        response = self._app.api.get_chat_history(self.session_id, size=1)
+        if response is not None and response.status_code == 200:
+            return None
+        return self._fetch_session()
+
     def show_error(self, message):
-        popup = Popup(
-            title='Error',
-            content=Label(text=message),
-            size_hint=(0.8, 0.3)
-        )
-        popup.open()
+        if self._error_popup is None:
+            self._error_popup = Popup(
+                title='Error',
+                content=Label(),
+                size_hint=(0.8, 0.3)
+            )
+        self._error_popup.content.text = message
+        self._error_popup.open()
@@ -3,10 +3,16 @@
 import os
 import json
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import threading
+import atexit
+import time
+from concurrent.futures import ThreadPoolExecutor
 from kivy.clock import Clock
 from datetime import datetime
-from functools import partial
+from functools import partial, lru_cache
+from weakref import WeakSet
 from chatbot_screen import ChatbotScreen # <-- Add this line
 
 # Kivy Core Imports
@@ -26,6 +32,7 @@ from kivy.uix.textinput import TextInput
 from kivy.uix.boxlayout import BoxLayout
 from kivy.uix.floatlayout import FloatLayout
 from kivy.uix.behaviors import ButtonBehavior
+from kivy.uix.recycleview.views import RecycleDataViewBehavior
 from kivy.animation import Animation
 import logging
 # Configure basic logging (outputs to console; you can adjust level/file as needed)
@@ -39,6 +46,14 @@ from kivy.properties import (
     NumericProperty
 )
 
+# Seconds a fetched copy of the reminder settings is reused before asking the server again
+_SETTINGS_TTL = 300
+
+# Theme colors parsed once; ListProperty copies them per instance
+_BLUE = get_color_from_hex('#4361ee')
+_GRAY = get_color_from_hex('#6c757d')
+_WHITE = get_color_from_hex('#f8f9fa')
+
 # --- Custom Widget Definitions ---
 # These classes are needed for the Kivy language files to work correctly.
 
@@ -46,13 +61,25 @@ class HoverBehavior(object):
     """Adds hover functionality to a widget."""
     hovering = BooleanProperty(False)
     border_point = None
+    # A single Window binding serves every hover widget; the set doesn't
+    # keep destroyed widgets alive
+    _instances = WeakSet()
+    _window_bound = False
 
     def __init__(self, **kwargs):
         self.register_event_type('on_enter')
         self.register_event_type('on_leave')
-        Window.bind(mouse_pos=self.on_mouse_pos)
+        HoverBehavior._instances.add(self)
+        if not HoverBehavior._window_bound:
+            Window.bind(mouse_pos=HoverBehavior._dispatch_mouse_pos)
+            HoverBehavior._window_bound = True
         super(HoverBehavior, self).__init__(**kwargs)
 
+    @staticmethod
+    def _dispatch_mouse_pos(window, pos):
+        for widget in list(HoverBehavior._instances):
+            widget.on_mouse_pos(window, pos)
+
     def on_mouse_pos(self, *args):
         if not self.get_root_window():
             return
@@ -76,12 +103,15 @@ class HoverBehavior(object):
 class ModernSwitch(ButtonBehavior, FloatLayout):
     """A visually appealing toggle switch."""
     active = BooleanProperty(False)
-    _track_color_active = ListProperty(get_color_from_hex('#4361ee'))
-    _track_color_inactive = ListProperty(get_color_from_hex('#6c757d'))
-    _thumb_color = ListProperty(get_color_from_hex('#f8f9fa'))
+    _track_color_active = ListProperty(_BLUE)
+    _track_color_inactive = ListProperty(_GRAY)
+    _thumb_color = ListProperty(_WHITE)
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
+        self._anim_on = None
+        self._anim_off = None
+        self.bind(pos=self._reset_anims, size=self._reset_anims)
         Clock.schedule_once(self._update_thumb_pos)
 
     def on_active(self, instance, value):
@@ -90,14 +120,20 @@ class ModernSwitch(ButtonBehavior, FloatLayout):
     def on_press(self):
         self.active = not self.active
 
+    def _reset_anims(self, *args):
+        # Thumb targets depend on the switch geometry; rebuilt on next toggle
+        self._anim_on = None
+        self._anim_off = None
+
     def _update_thumb_pos(self, *args):
-        if self.active:
-            pos = (self.right - self.ids.thumb.width - dp(4), self.y + dp(4))
-        else:
-            pos = (self.x + dp(4), self.y + dp(4))
+        thumb = self.ids.thumb
+        if self._anim_on is None:
+            self._anim_on = Animation(pos=(self.right - thumb.width - dp(4), self.y + dp(4)), duration=0.15, t='out_quad')
+            self._anim_off = Animation(pos=(self.x + dp(4), self.y + dp(4)), duration=0.15, t='out_quad')
         
-        anim = Animation(pos=pos, duration=0.15, t='out_quad')
-        anim.start(self.ids.thumb)
+        # Stop a running slide so rapid toggles don't stack animations
+        Animation.cancel_all(thumb)
+        (self._anim_on if self.active else self._anim_off).start(thumb)
 
 class GlassyCard(BoxLayout):
     pass
@@ -135,19 +171,23 @@ class GlassyButton(HoverBehavior, Button):
         if not color1 or not color2 or self.width <= 0 or self.height <= 0:
             return Texture.create(size=(1, 1))
 
-        texture = Texture.create(size=(int(self.width), int(self.height)), colorfmt='rgba')
-        buf = bytearray()
-        for x in range(int(self.width)):
-            for y in range(int(self.height)):
-                mix_ratio = x / float(self.width)
-                r = color1[0] * (1.0 - mix_ratio) + color2[0] * mix_ratio
-                g = color1[1] * (1.0 - mix_ratio) + color2[1] * mix_ratio
-                b = color1[2] * (1.0 - mix_ratio) + color2[2] * mix_ratio
-                a = color1[3] * (1.0 - mix_ratio) + color2[3] * mix_ratio
-                buf.extend([int(c * 255) for c in (r, g, b, a)])
-        
-        texture.blit_buffer(bytes(buf), colorfmt='rgba', bufferfmt='ubyte')
+        width, height = int(self.width), int(self.height)
+        buf = _gradient_bytes(width, height, tuple(color1[:4]), tuple(color2[:4]))
+        # Only the pixel bytes are cached; textures belong to the GL context
+        texture = Texture.create(size=(width, height), colorfmt='rgba')
+        texture.blit_buffer(buf, colorfmt='rgba', bufferfmt='ubyte')
         return texture
+
+@lru_cache(maxsize=64)
+def _gradient_bytes(width, height, color1, color2):
+    """RGBA bytes of a horizontal color1 -> color2 gradient, shared by same-sized buttons"""
+    # The color only depends on x, so compute one pixel per column and repeat it
+    columns = []
+    for x in range(width):
+        mix_ratio = x / float(width)
+        pixel = bytes(int((c1 * (1.0 - mix_ratio) + c2 * mix_ratio) * 255) for c1, c2 in zip(color1, color2))
+        columns.append(pixel * height)
+    return b''.join(columns)
 # -------------------------------------------------
 
 # Set window size for desktop testing
@@ -156,237 +196,190 @@ if platform != 'android':
 
 class APIManager:
     """Handles all API communications with the Flask backend"""
-    def update_bill_paid_status(self, bill_id, new_status, callback):
-        def _update_status():
-            try:
-                response = requests.put(
-                    f"{self.base_url}/bills/{bill_id}/status",
-                    json={'is_paid': new_status},
-                    headers=self.get_headers()
-                )
-                Clock.schedule_once(lambda dt: callback(response), 0)
-            except Exception as e:
-                Clock.schedule_once(lambda dt, err=str(e): callback(None, err), 0)
-        
-        threading.Thread(target=_update_status).start()
-    
     def __init__(self):
         self.base_url = "http://127.0.0.1:5000/api"
         self.token = None
+        # One pooled session keeps connections to the backend alive between calls
+        self.session = requests.Session()
+        # Idempotent calls back off and retry on gateway errors; the last
+        # response is still handed back if the retries run out
+        retry = Retry(total=3, backoff_factor=0.3, status_forcelist=[502, 503, 504],
+                      raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=10, pool_maxsize=20, max_retries=retry)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update({
+            'Content-Type': 'application/json',
+            'Connection': 'keep-alive'
+        })
+        # Bounded worker pool for the callback-style calls
+        self.executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='api')
+        atexit.register(self.executor.shutdown)
         self.store = JsonStore('bills_reminder.json')
+        self._store_lock = threading.Lock()
+        # (response, settings dict) from the last settings fetch, and when it was taken
+        self._settings_cache = None
+        self._settings_cache_ts = 0
         self.load_token()
     
     def load_token(self):
         if self.store.exists('auth'):
-            self.token = self.store.get('auth')['token']
+            self.set_auth_header(self.store.get('auth')['token'])
     
     def save_token(self, token):
-        self.token = token
-        self.store.put('auth', token=token)
+        self.set_auth_header(token)
+        # Requests use the in-memory token; the file write happens in the background
+        self.executor.submit(self._persist_token)
     
     def clear_token(self):
-        self.token = None
-        if self.store.exists('auth'):
-            self.store.delete('auth')
+        self.set_auth_header(None)
+        self._settings_cache = None
+        self.executor.submit(self._persist_token)
+    
+    def _persist_token(self):
+        # Writes whatever the token is now, so a late save can't undo a logout
+        with self._store_lock:
+            if self.token:
+                self.store.put('auth', token=self.token)
+            elif self.store.exists('auth'):
+                self.store.delete('auth')
+    
+    def set_auth_header(self, token):
+        """Keep the session's Authorization header in step with the token"""
+        self.token = token
+        if token:
+            self.session.headers['Authorization'] = f'Bearer {token}'
+        else:
+            self.session.headers.pop('Authorization', None)
+    
+    def _run(self, method, path, callback, decode=False, **kwargs):
+        """Send a request on the executor and hand the result to callback on the
+        Kivy thread: callback(response), callback(response, data=...) when decode
+        is set, or callback(None, error) if the request failed."""
+        future = self.executor.submit(self._request, method, path, decode, kwargs)
+        future.add_done_callback(partial(self._deliver, callback, decode))
+    
+    def _request(self, method, path, decode, kwargs):
+        response = self.session.request(method, f"{self.base_url}{path}", **kwargs)
+        data = None
+        if decode:
+            try:
+                data = response.json()
+            except ValueError:
+                pass
+        return response, data
     
-    def get_headers(self):
-        headers = {'Content-Type': 'application/json'}
-        if self.token:
-            headers['Authorization'] = f'Bearer {self.token}'
-        return headers
+    @staticmethod
+    def _deliver(callback, decode, future):
+        try:
+            response, data = future.result()
+        except Exception as e:
+            Clock.schedule_once(lambda dt, err=str(e): callback(None, err), 0)
+            return
+        if decode:
+            Clock.schedule_once(lambda dt: callback(response, data=data), 0)
+        else:
+            Clock.schedule_once(lambda dt: callback(response), 0)
     
     def register(self, email, password, name, phone_number, callback):
-        def _register():
-            try:
-                response = requests.post(
-                    f"{self.base_url}/auth/register",
-                    json={
-                        'email': email,
-                        'password': password,
-                        'name': name,
-                        'phone_number': phone_number
-                    },
-                    headers={'Content-Type': 'application/json'}
-                )
-                Clock.schedule_once(lambda dt: callback(response), 0)
-            except Exception as e:
-                Clock.schedule_once(lambda dt, err=str(e): callback(None, err), 0)
-        
-        threading.Thread(target=_register).start()
+        self._run('POST', '/auth/register', callback, decode=True, json={
+            'email': email,
+            'password': password,
+            'name': name,
+            'phone_number': phone_number
+        })
     
     def login(self, email, password, callback):
-        def _login():
-            try:
-                response = requests.post(
-                    f"{self.base_url}/auth/login",
-                    json={'email': email, 'password': password},
-                    headers={'Content-Type': 'application/json'}
-                )
-                Clock.schedule_once(lambda dt: callback(response), 0)
-            except Exception as e:
-                Clock.schedule_once(lambda dt, err=str(e): callback(None, err), 0)
-        
-        threading.Thread(target=_login).start()
+        self._run('POST', '/auth/login', callback, decode=True, json={'email': email, 'password': password})
     
     def get_bills(self, callback):
-        def _get_bills():
-            try:
-                response = requests.get(
-                    f"{self.base_url}/bills",
-                    headers=self.get_headers()
-                )
-                Clock.schedule_once(lambda dt: callback(response), 0)
-            except Exception as e:
-                Clock.schedule_once(lambda dt, err=str(e): callback(None, err), 0)
-        
-        threading.Thread(target=_get_bills).start()
+        # Decoded on the worker so a long bill list is not parsed on the UI thread
+        self._run('GET', '/bills', callback, decode=True)
     
     def create_bill(self, bill_data, callback, loan_data=None):
-        def _create_bill():
-            try:
-                response = requests.post(
-                    f"{self.base_url}/bills",
-                    json=bill_data,
-                    headers=self.get_headers()
-                )
-                
-                if response.status_code == 201 and loan_data:
-                    bill_id = response.json()['id']
-                    loan_data['bill_id'] = bill_id
-                    loan_response = requests.post(
-                        f"{self.base_url}/loans/{bill_id}",
-                        json=loan_data,
-                        headers=self.get_headers()
-                    )
-                    if loan_response.status_code == 201:
-                        Clock.schedule_once(lambda dt: callback(response), 0)
-                    else:
-                        Clock.schedule_once(lambda dt: callback(loan_response), 0)
-                else:
-                    Clock.schedule_once(lambda dt: callback(response), 0)
-            except Exception as e:
-                Clock.schedule_once(lambda dt, err=str(e): callback(None, err), 0)
-        
-        threading.Thread(target=_create_bill).start()
+        # A loan is created together with its bill in one request
+        payload = {'bill': bill_data, 'loan': loan_data} if loan_data else bill_data
+        self._run('POST', '/bills', callback, json=payload)
     
     def update_bill(self, bill_id, bill_data, callback):
-        def _update_bill():
-            try:
-                response = requests.put(
-                    f"{self.base_url}/bills/{bill_id}",
-                    json=bill_data,
-                    headers=self.get_headers()
-                )
-                Clock.schedule_once(lambda dt: callback(response), 0)
-            except Exception as e:
-                Clock.schedule_once(lambda dt, err=str(e): callback(None, err), 0)
-        
-        threading.Thread(target=_update_bill).start()
+        self._run('PUT', f"/bills/{bill_id}", callback, json=bill_data)
+    
+    def update_bill_paid_status(self, bill_id, new_status, callback):
+        self._run('PUT', f"/bills/{bill_id}/status", callback, json={'is_paid': new_status})
     
     def delete_bill(self, bill_id, callback):
-        def _delete_bill():
-            try:
-                response = requests.delete(
-                    f"{self.base_url}/bills/{bill_id}",
-                    headers=self.get_headers()
-                )
-                Clock.schedule_once(lambda dt: callback(response), 0)
-            except Exception as e:
-                Clock.schedule_once(lambda dt, err=str(e): callback(None, err), 0)
-        
-        threading.Thread(target=_delete_bill).start()
+        self._run('DELETE', f"/bills/{bill_id}", callback)
     
     def mark_bill_paid(self, bill_id, callback):
-        def _mark_paid():
-            try:
-                response = requests.post(
-                    f"{self.base_url}/bills/{bill_id}/pay",
-                    headers=self.get_headers()
-                )
-                Clock.schedule_once(lambda dt: callback(response), 0)
-            except Exception as e:
-                Clock.schedule_once(lambda dt, err=str(e): callback(None, err), 0)
-        
-        threading.Thread(target=_mark_paid).start()
+        self._run('POST', f"/bills/{bill_id}/pay", callback)
     
     def send_test_reminder(self, reminder_type, callback):
-        def _send_reminder():
-            logging.info(f"Starting API call for test reminder type: {reminder_type}")
-            try:
-                response = requests.post(
-                    f"{self.base_url}/reminders/test",
-                    json={'type': reminder_type},
-                    headers=self.get_headers()
-                )
+        logging.info(f"Starting API call for test reminder type: {reminder_type}")
+        
+        def _logged(response, error=None):
+            if error:
+                logging.error(f"Error in API call for test reminder type: {reminder_type}: {error}")
+                callback(None, error)
+            else:
                 logging.info(f"API call completed for test reminder type: {reminder_type}. Status: {response.status_code}")
-                Clock.schedule_once(lambda dt: callback(response), 0)
-            except Exception as e:
-                logging.error(f"Error in API call for test reminder type: {reminder_type}: {str(e)}")
-                Clock.schedule_once(lambda dt, err=str(e): callback(None, err), 0)
+                callback(response)
         
-        threading.Thread(target=_send_reminder).start()
+        self._run('POST', '/reminders/test', _logged, json={'type': reminder_type})
     
     def get_reminder_settings(self, callback):
-        def _get_settings():
-            try:
-                response = requests.get(
-                    f"{self.base_url}/reminders/settings",
-                    headers=self.get_headers()
-                )
-                Clock.schedule_once(lambda dt: callback(response), 0)
-            except Exception as e:
-                Clock.schedule_once(lambda dt, err=str(e): callback(None, err), 0)
+        cached = self._settings_cache
+        if cached and time.monotonic() - self._settings_cache_ts < _SETTINGS_TTL:
+            # Settings rarely change; re-entering the screen reuses the last copy
+            Clock.schedule_once(lambda dt: callback(cached[0], data=cached[1]), 0)
+            return
         
-        threading.Thread(target=_get_settings).start()
+        def _store(response, error=None, data=None):
+            if response is not None and response.status_code == 200 and data is not None:
+                self._settings_cache = (response, data)
+                self._settings_cache_ts = time.monotonic()
+            callback(response, error, data=data)
+        
+        self._run('GET', '/reminders/settings', _store, decode=True)
     
     def update_reminder_settings(self, settings, callback):
-        def _update_settings():
-            try:
-                response = requests.put(
-                    f"{self.base_url}/reminders/settings",
-                    json=settings,
-                    headers=self.get_headers()
-                )
-                Clock.schedule_once(lambda dt: callback(response), 0)
-            except Exception as e:
-                Clock.schedule_once(lambda dt, err=str(e): callback(None, err), 0)
+        def _update_cache(response, error=None):
+            cached = self._settings_cache
+            if cached and response is not None and response.status_code == 200:
+                self._settings_cache = (cached[0], {**cached[1], **settings})
+            else:
+                self._settings_cache = None
+            callback(response, error)
         
-        threading.Thread(target=_update_settings).start()
+        self._run('PUT', '/reminders/settings', _update_cache, json=settings)
         
     def create_chat_session(self, ai_provider='gemini'):
         try:
-            response = requests.post(
+            response = self.session.post(
                 f"{self.base_url}/chat/session",
-                json={'ai_provider': ai_provider},
-                headers=self.get_headers()
+                json={'ai_provider': ai_provider}
             )
             return response
         except Exception as e:
             print(f"Error creating chat session: {e}")
             return None
     
-    def send_chat_message(self, session_id, message, callback): # <-- Add callback
-        def _send_message():
-            try:
-                response = requests.post(
-                    f"{self.base_url}/chat/message",
-                    json={
-                        'session_id': session_id,
-                        'message': message
-                    },
-                    headers=self.get_headers()
-                )
-                Clock.schedule_once(lambda dt: callback(response), 0) # <-- Use callback
-            except Exception as e:
-                Clock.schedule_once(lambda dt, err=str(e): callback(None, err), 0)
-        
-        threading.Thread(target=_send_message).start() # <-- Start the thread
-    
-    def get_chat_history(self, session_id):
+    def send_chat_message(self, session_id, message, callback):
+        # Decoded on the worker so a large reply is not parsed on the UI thread
+        self._run('POST', '/chat/message', callback, decode=True, json={
+            'session_id': session_id,
+            'message': message
+        })
+    
+    def get_chat_history(self, session_id, cursor=None, size=None):
+        params = {}
+        if cursor:
+            params['cursor'] = cursor
+        if size:
+            params['size'] = size
         try:
-            response = requests.get(
+            response = self.session.get(
                 f"{self.base_url}/chat/history/{session_id}",
-                headers=self.get_headers()
+                params=params
             )
             return response
         except Exception as e:
@@ -395,9 +388,8 @@ class APIManager:
 
     def get_chat_preferences(self):
         try:
-            response = requests.get(
-                f"{self.base_url}/chat/preferences",
-                headers=self.get_headers()
+            response = self.session.get(
+                f"{self.base_url}/chat/preferences"
             )
             return response
         except Exception as e:
@@ -405,66 +397,17 @@ class APIManager:
             return None
         
     def update_chat_preferences(self, preferences, callback):
-        def _update_preferences():
-            try:
-                response = requests.put(
-                    f"{self.base_url}/chat/preferences",
-                    json=preferences,
-                    headers=self.get_headers()
-                )
-                Clock.schedule_once(lambda dt: callback(response), 0)
-            except Exception as e:
-                Clock.schedule_once(lambda dt, err=str(e): callback(None, err), 0)
-        
-        threading.Thread(target=_update_preferences).start()
+        self._run('PUT', '/chat/preferences', callback, json=preferences)
     
     def get_chat_suggestions(self):
         try:
-            response = requests.get(
-                f"{self.base_url}/chat/suggestions",
-                headers=self.get_headers()
+            response = self.session.get(
+                f"{self.base_url}/chat/suggestions"
             )
             return response
         except Exception as e:
             print(f"Error getting chat suggestions: {e}")
-            return None    
-    def create_bill(self, bill_data, callback, loan_data=None):
-        """Create new bill, with optional loan details."""
-        def _create_bill():
-            try:
-                # 1. Create the main bill entry first
-                response = requests.post(
-                    f"{self.base_url}/bills",
-                    json=bill_data,
-                    headers=self.get_headers()
-                )
-                
-                # Check if the first call was successful and loan data exists
-                if response.status_code == 201 and loan_data:
-                    bill_id = response.json()['id']
-                    
-                    # 2. If it's a loan, create the loan details entry
-                    # Pass the bill_id from the first response to the new loan data
-                    loan_data['bill_id'] = bill_id 
-                    loan_response = requests.post(
-                        f"{self.base_url}/loans/{bill_id}",
-                        json=loan_data,
-                        headers=self.get_headers()
-                    )
-                    
-                    # Call the callback with the response from the loan creation
-                    if loan_response.status_code == 201:
-                        Clock.schedule_once(lambda dt: callback(loan_response), 0)
-                    else:
-                        Clock.schedule_once(lambda dt: callback(loan_response), 0)
-                else:
-                    # If it's not a loan, or the first call failed,
-                    # use the original response for the callback
-                    Clock.schedule_once(lambda dt: callback(response), 0)
-            except Exception as e:
-                Clock.schedule_once(lambda dt, err=str(e): callback(None, err), 0)
-        
-        threading.Thread(target=_create_bill).start()
+            return None
 
 class LoginScreen(Screen):
     pass
@@ -474,6 +417,7 @@ class RegisterScreen(Screen):
 
 class DashboardScreen(Screen):
     bills_data = ListProperty([])
+    bills_loaded = BooleanProperty(False)
     
     def on_enter(self):
         self.load_bills()
@@ -500,34 +444,21 @@ class DashboardScreen(Screen):
         app = App.get_running_app()
         app.api.get_bills(self.on_bills_loaded)
     
-    def on_bills_loaded(self, response, error=None):
+    def on_bills_loaded(self, response, error=None, data=None):
         if error:
             self.show_error("Failed to load bills")
             return
         
-        if response and response.status_code == 200:
-            self.bills_data = response.json()
+        if response and response.status_code == 200 and data is not None:
+            self.bills_data = data
+            self.bills_loaded = True
             self.update_bills_display()
         else:
             self.show_error("Failed to load bills")
     
     def update_bills_display(self):
-        bills_list = self.ids.bills_list
-        bills_list.clear_widgets()
-        
-        if not self.bills_data:
-            bills_list.add_widget(Label(
-                text="No bills found\nTap + to add your first bill",
-                size_hint_y=None,
-                height=dp(100),
-                halign='center'
-            ))
-            return
-        
-        for bill in self.bills_data:
-            bill_item = BillItem()
-            bill_item.bill_data = bill
-            bills_list.add_widget(bill_item)
+        # Each bill dict is a RecycleView data entry; the empty state is handled in kv
+        self.ids.bills_list.data = self.bills_data
     
     def show_error(self, message):
         popup = Popup(
@@ -537,24 +468,45 @@ class DashboardScreen(Screen):
         )
         popup.open()
 
-class BillItem(BoxLayout):
+_PAID_COLOR = (0, 0.7, 0, 1)
+_PENDING_COLOR = (1, 0, 0, 1)
+
+@lru_cache(maxsize=512)
+def _fmt_due(iso, fmt='%d %b %Y'):
+    """Format an ISO due date from the API, or None if it can't be parsed.
+    Cached because the same dates are formatted on every dashboard refresh."""
+    try:
+        return datetime.fromisoformat(iso.replace('Z', '+00:00')).strftime(fmt)
+    except ValueError:
+        return None
+
+class BillItem(RecycleDataViewBehavior, BoxLayout):
     bill_data = ObjectProperty({})
     
+    def refresh_view_attrs(self, rv, index, data):
+        # data is the bill dict itself, so hand it over whole instead of
+        # setting each of its keys as an attribute
+        self.bill_data = data
+    
+    def on_kv_post(self, base_widget):
+        # Rows are refilled on every scroll, so keep direct references to the labels
+        self._name_lbl = self.ids.bill_name
+        self._amount_lbl = self.ids.bill_amount
+        self._due_lbl = self.ids.bill_due_date
+        self._status_lbl = self.ids.status_label
+    
     def on_bill_data(self, instance, value):
         if value:
-            self.ids.bill_name.text = value.get('name', '')
-            self.ids.bill_amount.text = f"₹{value.get('amount', 0)}"
-            due_date = value.get('due_date', '')
+            get = value.get
+            self._name_lbl.text = get('name', '')
+            self._amount_lbl.text = f"₹{get('amount', 0)}"
+            due_date = get('due_date', '')
             if due_date:
-                try:
-                    date_obj = datetime.fromisoformat(due_date.replace('Z', '+00:00'))
-                    self.ids.bill_due_date.text = date_obj.strftime('%d %b %Y')
-                except:
-                    self.ids.bill_due_date.text = due_date
+                self._due_lbl.text = _fmt_due(due_date) or due_date
             
-            is_paid = value.get('is_paid', False)
-            self.ids.status_label.text = 'PAID' if is_paid else 'PENDING'
-            self.ids.status_label.color = (0, 0.7, 0, 1) if is_paid else (1, 0, 0, 1)
+            is_paid = get('is_paid', False)
+            self._status_lbl.text = 'PAID' if is_paid else 'PENDING'
+            self._status_lbl.color = _PAID_COLOR if is_paid else _PENDING_COLOR
     
     def mark_as_paid(self):
         app = App.get_running_app()
@@ -654,23 +606,21 @@ class AddBillScreen(Screen):
             self.clear_form()
     
     def populate_form(self):
-        self.ids.bill_name.text = self.bill_data.get('name', '')
-        self.ids.bill_amount.text = str(self.bill_data.get('amount', ''))
-        self.ids.bill_category.text = self.bill_data.get('category', 'utilities')
-        self.ids.bill_frequency.text = self.bill_data.get('frequency', 'monthly')
-        self.ids.bill_notes.text = self.bill_data.get('notes', '')
-        
-        reminder_prefs = self.bill_data.get('reminder_preferences', {})
+        get = self.bill_data.get
+        ids = self.ids
+        ids.bill_name.text = get('name', '')
+        ids.bill_amount.text = str(get('amount', ''))
+        ids.bill_category.text = get('category', 'utilities')
+        ids.bill_frequency.text = get('frequency', 'monthly')
+        ids.bill_notes.text = get('notes', '')
+        
+        reminder_prefs = get('reminder_preferences', {})
         # FIX: Use state == 'down' instead of a boolean value
-        self.ids.enable_call_switch.state = 'down' if reminder_prefs.get('enable_call', False) else 'normal'
+        ids.enable_call_switch.state = 'down' if reminder_prefs.get('enable_call', False) else 'normal'
         
-        due_date = self.bill_data.get('due_date', '')
+        due_date = get('due_date', '')
         if due_date:
-            try:
-                date_obj = datetime.fromisoformat(due_date.replace('Z', '+00:00'))
-                self.ids.bill_due_date.text = date_obj.strftime('%Y-%m-%d')
-            except:
-                self.ids.bill_due_date.text = ''
+            ids.bill_due_date.text = _fmt_due(due_date, '%Y-%m-%d') or ''
     
     def clear_form(self):
         self.ids.bill_name.text = ''
@@ -753,71 +703,15 @@ class AddBillScreen(Screen):
         )
         popup.open()
 
-
-
-
-
-def save_bill(self):
-    """Save or update bill."""
-    
-    # Check for empty fields
-    if not self.ids.bill_name.text or not self.ids.bill_due_date.text:
-        self.show_error("Please fill all required fields")
-        return
-
-    # More robust validation for the amount field
-    bill_amount_text = self.ids.bill_amount.text.strip()
-    if not bill_amount_text:
-        self.show_error("Please enter a bill amount")
-        return
-        
-    try:
-        amount = float(bill_amount_text)
-    except ValueError:
-        self.show_error("Invalid amount")
-        return
-    
-    # Build the main bill data payload
-    bill_data = {
-        'name': self.ids.bill_name.text,
-        'amount': amount,
-        'due_date': self.ids.bill_due_date.text + 'T00:00:00Z',
-        'category': self.ids.bill_category.text,
-        'frequency': self.ids.bill_frequency.text,
-        'notes': self.ids.bill_notes.text,
-        'reminder_preferences': {
-            'enable_whatsapp': True,
-            'enable_call': self.ids.enable_call_switch.state == 'down', # Corrected for ToggleButton
-            'enable_sms': False,
-            'enable_local_notification': True
-        }
-    }
-    
-    # Build the loan details payload if the switch is active
-    loan_data = None
-    if self.ids.loan_switch.state == 'down':  # CORRECTED LINE
-        try:
-            loan_data = {
-                'total_amount': float(self.ids.loan_total_amount.text),
-                'monthly_payment': float(self.ids.loan_monthly_payment.text),
-                'total_installments': int(self.ids.loan_installments.text),
-                'installments_paid': int(self.ids.loan_already_paid.text),
-                'interest_rate_percent': float(self.ids.loan_interest_rate.text)
-            }
-        except (ValueError, KeyError) as e:
-            self.show_error(f"Invalid input for loan details: {e}")
-            return
-
-    app = App.get_running_app()
-    if self.is_edit_mode and self.bill_data.get('id'):
-        app.api.update_bill(self.bill_data['id'], bill_data, self.on_save_response)
-    else:
-        app.api.create_bill(bill_data, self.on_save_response, loan_data=loan_data)
-
 # In the SettingsScreen class in main.py
 
 class SettingsScreen(Screen):
 
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        # Rapid toggles collapse into one PUT sent 0.5s after the last change
+        self._save_trigger = Clock.create_trigger(self._do_save, 0.5)
+
     def save_settings_on_toggle(self, switch):
         """
         Callback method to save settings immediately when a toggle button is pressed.
@@ -828,9 +722,9 @@ class SettingsScreen(Screen):
         app = App.get_running_app()
         app.api.get_reminder_settings(self.on_settings_loaded)
     
-    def on_settings_loaded(self, response, error=None):
-        if response and response.status_code == 200:
-            settings = response.json()
+    def on_settings_loaded(self, response, error=None, data=None):
+        if response and response.status_code == 200 and data is not None:
+            settings = data
             # FIX: Set the state based on the boolean value from the server.
             self.ids.whatsapp_switch.state = 'down' if settings.get('whatsapp_enabled', False) else 'normal'
             self.ids.call_switch.state = 'down' if settings.get('call_enabled', False) else 'normal'
@@ -838,8 +732,13 @@ class SettingsScreen(Screen):
             self.ids.notification_switch.state = 'down' if settings.get('local_notifications', True) else 'normal'
             self.ids.days_before_input.text = str(settings.get('days_before', 3))
             self.ids.preferred_time_input.text = settings.get('preferred_time', '09:00')
+            # The switches now mirror the server; don't write their on_state echoes back
+            self._save_trigger.cancel()
 
     def save_settings(self):
+        self._save_trigger()
+
+    def _do_save(self, *args):
         # This method combines all the correct logic in a single, properly defined function.
         settings = {
             # FIX: Get the boolean value from the state property.
@@ -879,6 +778,27 @@ class SettingsScreen(Screen):
         app.api.clear_token()
         app.root.current = 'login'
 
+class LazyScreenManager(ScreenManager):
+    """ScreenManager that loads a screen's kv file and builds the screen the
+    first time it is asked for, rather than building every screen at startup"""
+    
+    def __init__(self, factories, **kwargs):
+        # name -> (kv file, Screen class) for screens not built yet
+        self._factories = factories
+        super().__init__(**kwargs)
+    
+    def get_screen(self, name):
+        # Setting current goes through get_screen too, so this covers navigation
+        factory = self._factories.pop(name, None)
+        if factory:
+            kv_file, screen_cls = factory
+            Builder.load_file(kv_file)
+            self.add_widget(screen_cls(name=name))
+        return super().get_screen(name)
+    
+    def has_screen(self, name):
+        return name in self._factories or super().has_screen(name)
+
 class BillsReminderApp(App):
     
     def build(self):
@@ -886,18 +806,15 @@ class BillsReminderApp(App):
         self.title = 'Bills Reminder'
         Builder.load_file('styles.kv')
         Builder.load_file('auth_screens.kv')
-        Builder.load_file('dashboard_screen.kv')
-        Builder.load_file('add_bill_screen.kv')
-        Builder.load_file('settings_screen.kv')
-        Builder.load_file('chatbot_screen.kv')
         
-        sm = ScreenManager(transition=FadeTransition(duration=0.2))
+        sm = LazyScreenManager({
+            'dashboard': ('dashboard_screen.kv', DashboardScreen),
+            'add_bill': ('add_bill_screen.kv', AddBillScreen),
+            'settings': ('settings_screen.kv', SettingsScreen),
+            'chatbot': ('chatbot_screen.kv', ChatbotScreen),
+        }, transition=FadeTransition(duration=0.2))
         sm.add_widget(LoginScreen(name='login'))
         sm.add_widget(RegisterScreen(name='register'))
-        sm.add_widget(DashboardScreen(name='dashboard'))
-        sm.add_widget(AddBillScreen(name='add_bill'))
-        sm.add_widget(SettingsScreen(name='settings'))
-        sm.add_widget(ChatbotScreen(name='chatbot'))
         
         if self.api.token:
             sm.current = 'dashboard'
@@ -920,12 +837,11 @@ class BillsReminderApp(App):
             return
         self.api.login(email, password, self.on_login_response)
     
-    def on_login_response(self, response, error=None):
+    def on_login_response(self, response, error=None, data=None):
         if error:
             self.show_popup('Error', 'Connection failed')
             return
-        if response and response.status_code == 200:
-            data = response.json()
+        if response and response.status_code == 200 and data:
             self.api.save_token(data['token'])
             self.root.current = 'dashboard'
         else:
@@ -937,12 +853,11 @@ class BillsReminderApp(App):
             return
         self.api.register(email, password, name, phone, self.on_register_response)
     
-    def on_register_response(self, response, error=None):
+    def on_register_response(self, response, error=None, data=None):
         if error:
             self.show_popup('Error', 'Connection failed')
             return
-        if response and response.status_code == 201:
-            data = response.json()
+        if response and response.status_code == 201 and data:
             self.api.save_token(data['token'])
             self.root.current = 'dashboard'
         elif response and response.status_code == 409:
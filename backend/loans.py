@@ -3,15 +3,50 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from models import db, LoanDetails, Bill
+from scheduler import shift_by_frequency
+from datetime import datetime
 import logging
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import contains_eager
 
-# Configure logging
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
 loans_bp = Blueprint('loans', __name__)
 
+# How many upcoming EMI bills are created ahead when a loan is set up
+EMI_BILLS_AHEAD = 12
+
+def build_emi_bills(bill, loan):
+    """
+    Build the next installments' bills for a new loan so they can be inserted
+    together with it, spaced by the bill's frequency. Once these are paid, the
+    recurring-bills job carries on creating the following period's bill as it
+    does for any recurring bill. A bill that doesn't recur gets none.
+    """
+    if shift_by_frequency(bill.due_date, bill.frequency) is None:
+        return []
+    
+    remaining = loan.total_installments - (loan.installments_paid or 0) - 1
+    first = (loan.installments_paid or 0) + 2
+    return [
+        Bill(
+            user_id=bill.user_id,
+            name=bill.name,
+            amount=bill.amount,
+            # Midnight, matching the due dates the recurring-bills job looks up
+            due_date=datetime.combine(shift_by_frequency(bill.due_date.date(), bill.frequency, i), datetime.min.time()),
+            category=bill.category,
+            frequency=bill.frequency,
+            is_paid=False,
+            notes=f"Auto-generated EMI {first + i - 1} of {loan.total_installments}",
+            enable_whatsapp=bill.enable_whatsapp,
+            enable_call=bill.enable_call,
+            enable_sms=bill.enable_sms,
+            enable_local_notification=bill.enable_local_notification
+        )
+        for i in range(1, min(remaining, EMI_BILLS_AHEAD) + 1)
+    ]
+
 @loans_bp.route('/loans', methods=['GET'])
 @jwt_required()
 def get_loans():
@@ -77,8 +112,11 @@ def create_loan(bill_id):
         )
         
         db.session.add(loan)
+        # Upcoming installments go in with the loan as one batched insert
+        emi_bills = build_emi_bills(bill, loan)
+        db.session.add_all(emi_bills)
         db.session.commit()
-        logger.info(f"[LOANS CREATE] Successfully created loan for bill {bill_id}")
+        logger.info(f"[LOANS CREATE] Successfully created loan for bill {bill_id} with {len(emi_bills)} upcoming EMI bills")
 
         return jsonify({
             'message': 'Loan details created successfully',
@@ -102,8 +140,11 @@ def pay_loan_installment(loan_id):
     user_id = get_jwt_identity()
     logger.info(f"[LOANS PAY] Request to mark installment paid for loan: {loan_id} by user: {user_id}")
 
-    loan = LoanDetails.query.get(loan_id)
-    if not loan or loan.bill.user_id != user_id:
+    # Loan and owning bill in one query; the ownership check is part of the filter
+    loan = LoanDetails.query.join(LoanDetails.bill).options(
+        contains_eager(LoanDetails.bill)
+    ).filter(LoanDetails.id == loan_id, Bill.user_id == user_id).first()
+    if not loan:
         return jsonify({'message': 'Loan not found or access denied'}), 404
     
     if loan.installments_paid >= loan.total_installments:
@@ -6,8 +6,6 @@ from flask import send_file, current_app
 import shutil
 import logging
 
-# Configure logging
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
 # Create uploads directory if it doesn't exist
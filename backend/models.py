@@ -1,16 +1,37 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.ext.hybrid import hybrid_property
 from datetime import datetime
-import uuid
+import os
+import time
 import logging
 
-# Configure logging
-logging.basicConfig(level=logging.DEBUG)
+# Level and handlers are configured by the application in create_app
 logger = logging.getLogger(__name__)
 
 db = SQLAlchemy()
 
+# Keys and the foreign keys that reference them are native UUID on PostgreSQL and
+# String(36) elsewhere, so ids keep their hyphenated text form on every backend.
+UUID_KEY = db.String(36).with_variant(db.Uuid(as_uuid=False), 'postgresql')
+
+_urandom = os.urandom
+
+def new_id():
+    """
+    Return a UUIDv7 string. The leading 48 bits are the Unix time in milliseconds,
+    so new keys sort after existing ones and inserts append to the end of the
+    primary key index instead of landing on random pages.
+    """
+    ms = time.time_ns() // 1_000_000
+    rand = int.from_bytes(_urandom(10), 'big')
+    value = ((ms & 0xFFFFFFFFFFFF) << 80 | 0x7 << 76 | (rand >> 62 & 0xFFF) << 64
+             | 0b10 << 62 | rand & 0x3FFFFFFFFFFFFFFF)
+    # Formatted directly; same text as str(uuid.UUID(int=value)) without the object
+    h = f'{value:032x}'
+    return f'{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}'
+
 class User(db.Model):
-    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    id = db.Column(UUID_KEY, primary_key=True, default=new_id)
     email = db.Column(db.String(120), unique=True, nullable=False)
     password_hash = db.Column(db.String(255), nullable=False)
     name = db.Column(db.String(100), nullable=False)
@@ -23,25 +44,15 @@ class User(db.Model):
     def __init__(self, **kwargs):
         super(User, self).__init__(**kwargs)
         logger.info(f"[USER MODEL] Creating new user with email: {kwargs.get('email')}")
-        logger.debug(f"[USER MODEL] User data: name={kwargs.get('name')}, phone={kwargs.get('phone_number')}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("[USER MODEL] User data: name=%s, phone=%s", kwargs.get('name'), kwargs.get('phone_number'))
     
     def __repr__(self):
         return f'<User {self.id}: {self.email}>'
-    
-    @property
-    def _details(self):
-        """Property for detailed logging"""
-        return {
-            'id': self.id,
-            'email': self.email,
-            'name': self.name,
-            'phone_number': self.phone_number,
-            'created_at': self.created_at.isoformat() if self.created_at else None
-        }
 
 class Bill(db.Model):
-    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-    user_id = db.Column(db.String(36), db.ForeignKey('user.id'), nullable=False)
+    id = db.Column(UUID_KEY, primary_key=True, default=new_id)
+    user_id = db.Column(UUID_KEY, db.ForeignKey('user.id'), nullable=False)
     name = db.Column(db.String(100), nullable=False)
     amount = db.Column(db.Float, nullable=False)
     due_date = db.Column(db.DateTime, nullable=False)
@@ -62,73 +73,60 @@ class Bill(db.Model):
     
     payments = db.relationship('Payment', backref='bill', lazy=True, cascade='all, delete-orphan')
     
+    __table_args__ = (
+        # Serves per-user unpaid/overdue/upcoming lookups
+        db.Index('ix_bill_user_paid_due', 'user_id', 'is_paid', 'due_date'),
+        # Serves the recurring job's lookup for an existing next instance
+        db.Index('ix_bill_user_name_due', 'user_id', 'name', 'due_date'),
+        # Serves the scheduler's cross-user scan for unpaid bills past their due date
+        db.Index('ix_bill_paid_due', 'is_paid', 'due_date'),
+    )
+    
     def __init__(self, **kwargs):
         super(Bill, self).__init__(**kwargs)
         logger.info(f"[BILL MODEL] Creating new bill: {kwargs.get('name')} for user: {kwargs.get('user_id')}")
-        logger.debug(f"[BILL MODEL] Bill details: amount={kwargs.get('amount')}, due_date={kwargs.get('due_date')}, category={kwargs.get('category')}")
-        logger.debug(f"[BILL MODEL] Reminder settings: whatsapp={kwargs.get('enable_whatsapp', True)}, call={kwargs.get('enable_call', False)}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("[BILL MODEL] Bill details: amount=%s, due_date=%s, category=%s",
+                         kwargs.get('amount'), kwargs.get('due_date'), kwargs.get('category'))
+            logger.debug("[BILL MODEL] Reminder settings: whatsapp=%s, call=%s",
+                         kwargs.get('enable_whatsapp', True), kwargs.get('enable_call', False))
     
     def __repr__(self):
         return f'<Bill {self.id}: {self.name}>'
     
-    @property
-    def _details(self):
-        """Property for detailed logging"""
-        return {
-            'id': self.id,
-            'user_id': self.user_id,
-            'name': self.name,
-            'amount': self.amount,
-            'due_date': self.due_date.isoformat() if self.due_date else None,
-            'category': self.category,
-            'frequency': self.frequency,
-            'is_paid': self.is_paid,
-            'enable_whatsapp': self.enable_whatsapp,
-            'enable_call': self.enable_call,
-            'notes': self.notes[:50] + '...' if self.notes and len(self.notes) > 50 else self.notes
-        }
-    
     @property
     def days_until_due(self):
         """Calculate days until due date"""
         if self.due_date:
-            days = (self.due_date.date() - datetime.now().date()).days
-            logger.debug(f"[BILL MODEL] Bill {self.id} days until due: {days}")
-            return days
+            return (self.due_date.date() - datetime.now().date()).days
         return None
 
 class Payment(db.Model):
-    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-    bill_id = db.Column(db.String(36), db.ForeignKey('bill.id'), nullable=False)
+    id = db.Column(UUID_KEY, primary_key=True, default=new_id)
+    bill_id = db.Column(UUID_KEY, db.ForeignKey('bill.id'), nullable=False)
     amount = db.Column(db.Float, nullable=False)
     payment_date = db.Column(db.DateTime, default=datetime.utcnow)
     payment_method = db.Column(db.String(50))
     notes = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    __table_args__ = (
+        # Serves loading a bill's payments (including the delete cascade) in date order
+        db.Index('ix_payment_bill_date', 'bill_id', 'payment_date'),
+    )
+    
     def __init__(self, **kwargs):
         super(Payment, self).__init__(**kwargs)
         logger.info(f"[PAYMENT MODEL] Creating new payment for bill: {kwargs.get('bill_id')}")
-        logger.debug(f"[PAYMENT MODEL] Payment details: amount={kwargs.get('amount')}, method={kwargs.get('payment_method')}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("[PAYMENT MODEL] Payment details: amount=%s, method=%s", kwargs.get('amount'), kwargs.get('payment_method'))
     
     def __repr__(self):
         return f'<Payment {self.id}: {self.amount}>'
-    
-    @property
-    def _details(self):
-        """Property for detailed logging"""
-        return {
-            'id': self.id,
-            'bill_id': self.bill_id,
-            'amount': self.amount,
-            'payment_date': self.payment_date.isoformat() if self.payment_date else None,
-            'payment_method': self.payment_method,
-            'notes': self.notes[:50] + '...' if self.notes and len(self.notes) > 50 else self.notes
-        }
 
 class ReminderSettings(db.Model):
-    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-    user_id = db.Column(db.String(36), db.ForeignKey('user.id'), nullable=False)
+    id = db.Column(UUID_KEY, primary_key=True, default=new_id)
+    user_id = db.Column(UUID_KEY, db.ForeignKey('user.id'), nullable=False)
     local_notifications = db.Column(db.Boolean, default=True)
     whatsapp_enabled = db.Column(db.Boolean, default=True)
     call_enabled = db.Column(db.Boolean, default=True)
@@ -140,85 +138,99 @@ class ReminderSettings(db.Model):
     def __init__(self, **kwargs):
         super(ReminderSettings, self).__init__(**kwargs)
         logger.info(f"[REMINDER SETTINGS] Creating settings for user: {kwargs.get('user_id')}")
-        logger.debug(f"[REMINDER SETTINGS] Settings: whatsapp={kwargs.get('whatsapp_enabled', False)}, call={kwargs.get('call_enabled', False)}")
-        logger.debug(f"[REMINDER SETTINGS] Timing: days_before={kwargs.get('days_before', 3)}, preferred_time={kwargs.get('preferred_time', '09:00')}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("[REMINDER SETTINGS] Settings: whatsapp=%s, call=%s",
+                         kwargs.get('whatsapp_enabled', False), kwargs.get('call_enabled', False))
+            logger.debug("[REMINDER SETTINGS] Timing: days_before=%s, preferred_time=%s",
+                         kwargs.get('days_before', 3), kwargs.get('preferred_time', '09:00'))
     
     def __repr__(self):
         return f'<ReminderSettings {self.id}: User {self.user_id}>'
-    
-    @property
-    def _details(self):
-        """Property for detailed logging"""
-        return {
-            'id': self.id,
-            'user_id': self.user_id,
-            'local_notifications': self.local_notifications,
-            'whatsapp_enabled': self.whatsapp_enabled,
-            'call_enabled': self.call_enabled,
-            'sms_enabled': self.sms_enabled,
-            'days_before': self.days_before,
-            'preferred_time': self.preferred_time,
-            'created_at': self.created_at.isoformat() if self.created_at else None
-        }
-
-# Database event listeners for logging
-from sqlalchemy import event
 
-@event.listens_for(User, 'after_insert')
-def log_user_insert(mapper, connection, target):
-    logger.info(f"[DB EVENT] User created: {target._details}")
+# Database event listeners for logging. Fields are passed as %-style arguments
+# and each listener returns early when INFO records would be dropped anyway.
+from collections import Counter
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+class _Truncated:
+    """Log argument that shortens long text only if the record is formatted"""
+    __slots__ = ('text', 'limit')
+    
+    def __init__(self, text, limit):
+        self.text = text
+        self.limit = limit
+    
+    def __str__(self):
+        text = self.text
+        if text and len(text) > self.limit:
+            return text[:self.limit] + '...'
+        return str(text)
+
+@event.listens_for(Session, 'after_flush')
+def log_flush_inserts(session, flush_context):
+    # One line per flush for all new rows instead of one per inserted row
+    if not session.new or not logger.isEnabledFor(logging.INFO):
+        return
+    counts = Counter(type(obj).__name__ for obj in session.new)
+    logger.info("[DB EVENT] Inserted: %s", dict(counts))
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("[DB EVENT] Inserted ids: %s",
+                     [f"{type(obj).__name__}:{getattr(obj, 'id', None)}" for obj in list(session.new)[:10]])
 
 @event.listens_for(User, 'after_update')
 def log_user_update(mapper, connection, target):
-    logger.info(f"[DB EVENT] User updated: {target._details}")
+    if not logger.isEnabledFor(logging.INFO):
+        return
+    logger.info("[DB EVENT] User updated: id=%s email=%s name=%s phone_number=%s created_at=%s",
+                target.id, target.email, target.name, target.phone_number, target.created_at)
 
 @event.listens_for(User, 'after_delete')
 def log_user_delete(mapper, connection, target):
-    logger.info(f"[DB EVENT] User deleted: {target.id}")
-
-@event.listens_for(Bill, 'after_insert')
-def log_bill_insert(mapper, connection, target):
-    logger.info(f"[DB EVENT] Bill created: {target._details}")
+    logger.info("[DB EVENT] User deleted: %s", target.id)
 
 @event.listens_for(Bill, 'after_update')
 def log_bill_update(mapper, connection, target):
-    logger.info(f"[DB EVENT] Bill updated: {target._details}")
-    if hasattr(target, '_sa_instance_state'):
-        # Log what changed
-        history = db.inspect(target).attrs
-        changes = {}
-        for attr in history:
-            hist = attr.history
-            if hist.has_changes():
-                changes[attr.key] = {
-                    'from': hist.deleted[0] if hist.deleted else None,
-                    'to': hist.added[0] if hist.added else None
-                }
-        if changes:
-            logger.debug(f"[DB EVENT] Bill {target.id} changes: {changes}")
+    if not logger.isEnabledFor(logging.INFO):
+        return
+    logger.info("[DB EVENT] Bill updated: id=%s user_id=%s name=%s amount=%s due_date=%s "
+                "category=%s frequency=%s is_paid=%s enable_whatsapp=%s enable_call=%s notes=%s",
+                target.id, target.user_id, target.name, target.amount, target.due_date,
+                target.category, target.frequency, target.is_paid, target.enable_whatsapp,
+                target.enable_call, _Truncated(target.notes, 50))
+    # Walking every attribute's history is only worth it when the changes get logged
+    if not logger.isEnabledFor(logging.DEBUG):
+        return
+    changes = {}
+    for attr in db.inspect(target).attrs:
+        hist = attr.history
+        if hist.has_changes():
+            changes[attr.key] = {
+                'from': hist.deleted[0] if hist.deleted else None,
+                'to': hist.added[0] if hist.added else None
+            }
+    if changes:
+        logger.debug("[DB EVENT] Bill %s changes: %s", target.id, changes)
 
 @event.listens_for(Bill, 'after_delete')
 def log_bill_delete(mapper, connection, target):
-    logger.info(f"[DB EVENT] Bill deleted: {target.id} - {target.name}")
-
-@event.listens_for(Payment, 'after_insert')
-def log_payment_insert(mapper, connection, target):
-    logger.info(f"[DB EVENT] Payment created: {target._details}")
-
-@event.listens_for(ReminderSettings, 'after_insert')
-def log_settings_insert(mapper, connection, target):
-    logger.info(f"[DB EVENT] ReminderSettings created: {target._details}")
+    logger.info("[DB EVENT] Bill deleted: %s - %s", target.id, target.name)
 
 @event.listens_for(ReminderSettings, 'after_update')
 def log_settings_update(mapper, connection, target):
-    logger.info(f"[DB EVENT] ReminderSettings updated: {target._details}")
+    if not logger.isEnabledFor(logging.INFO):
+        return
+    logger.info("[DB EVENT] ReminderSettings updated: id=%s user_id=%s local_notifications=%s "
+                "whatsapp_enabled=%s call_enabled=%s sms_enabled=%s days_before=%s preferred_time=%s",
+                target.id, target.user_id, target.local_notifications, target.whatsapp_enabled,
+                target.call_enabled, target.sms_enabled, target.days_before, target.preferred_time)
 
 
 
 # new model to store loan-specific information
 class LoanDetails(db.Model):
-    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-    bill_id = db.Column(db.String(36), db.ForeignKey('bill.id'), nullable=False, unique=True)
+    id = db.Column(UUID_KEY, primary_key=True, default=new_id)
+    bill_id = db.Column(UUID_KEY, db.ForeignKey('bill.id'), nullable=False, unique=True)
     total_amount = db.Column(db.Float, nullable=False)
     monthly_payment = db.Column(db.Float, nullable=False)
     total_installments = db.Column(db.Integer, nullable=False)
@@ -226,8 +238,9 @@ class LoanDetails(db.Model):
     interest_rate_percent = db.Column(db.Float, default=0)
     is_active = db.Column(db.Boolean, default=True)
 
-    @property
+    @hybrid_property
     def amount_remaining(self):
+        # Usable both on instances and in queries, e.g. func.sum(LoanDetails.amount_remaining)
         return self.total_amount - (self.installments_paid * self.monthly_payment)
 
     def __repr__(self):
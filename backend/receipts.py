@@ -11,8 +11,6 @@ import json
 import os
 import logging
 
-# Configure logging
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
 receipts_bp = Blueprint('receipts', __name__)
@@ -9,8 +9,6 @@ import google.generativeai as genai
 from config import Config
 import logging
 
-# Configure logging
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
 # Configure Gemini
@@ -6,8 +6,6 @@ from elevenlabs_service import generate_voice_audio
 from datetime import datetime
 import logging
 
-# Configure logging
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
 reminders_bp = Blueprint('reminders', __name__)
@@ -2,19 +2,37 @@
 
 from apscheduler.schedulers.background import BackgroundScheduler
 from datetime import datetime, timedelta
-from dateutil.relativedelta import relativedelta
-from models import db, Bill, User, ReminderSettings
+from models import db, Bill, User, ReminderSettings, LoanDetails
+from sqlalchemy import tuple_
 from reminder_service import generate_reminder_message, send_whatsapp_reminder, send_voice_call_reminder
 import pytz
 import logging
 import json
+import calendar
 
-# Configure logging
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
 scheduler = BackgroundScheduler()
 
+def add_months(d, n):
+    """Shift a date by n months, clamping the day to the target month's length"""
+    m = d.month - 1 + n
+    y = d.year + m // 12
+    m = m % 12 + 1
+    return d.replace(year=y, month=m, day=min(d.day, calendar.monthrange(y, m)[1]))
+
+def shift_by_frequency(d, frequency, n=1):
+    """Move a date n periods of a recurring bill's frequency, or None if it doesn't recur"""
+    if frequency == 'weekly':
+        return d + timedelta(weeks=n)
+    if frequency == 'monthly':
+        return add_months(d, n)
+    if frequency == 'quarterly':
+        return add_months(d, 3 * n)
+    if frequency == 'yearly':
+        return add_months(d, 12 * n)
+    return None
+
 def start_scheduler(app):
     """
     Initializes and starts the background scheduler.
@@ -137,7 +155,8 @@ def start_scheduler(app):
         Stored in bill notes as JSON.
         """
         try:
-            if bill.notes:
+            # Plain-text notes can't hold the date; skip parsing them on every minute's check
+            if bill.notes and bill.notes.lstrip().startswith('{'):
                 notes_data = json.loads(bill.notes)
                 if isinstance(notes_data, dict) and 'last_reminder_date' in notes_data:
                     return datetime.strptime(notes_data['last_reminder_date'], '%Y-%m-%d').date()
@@ -153,7 +172,7 @@ def start_scheduler(app):
             notes_data = {}
             if bill.notes:
                 try:
-                    notes_data = json.loads(bill.notes)
+                    notes_data = json.loads(bill.notes) if bill.notes.lstrip().startswith('{') else None
                     if not isinstance(notes_data, dict):
                         notes_data = {'original_notes': bill.notes}
                 except json.JSONDecodeError:
@@ -183,37 +202,62 @@ def start_scheduler(app):
             
             logger.info(f"[RECURRING CHECK] Found {len(recurring_bills)} paid recurring bills")
             
+            # EMI bills share their loan bill's user and name; once every installment
+            # of that loan is paid, its bills stop recurring
+            finished_loans = set()
+            open_loans = set()
+            for user_id, name, paid, total, active in db.session.query(
+                Bill.user_id, Bill.name, LoanDetails.installments_paid,
+                LoanDetails.total_installments, LoanDetails.is_active
+            ).join(LoanDetails, Bill.id == LoanDetails.bill_id).all():
+                if active is False or (paid or 0) >= total:
+                    finished_loans.add((user_id, name))
+                else:
+                    open_loans.add((user_id, name))
+            finished_loans -= open_loans
+            
+            # Work out every next instance first, keyed the way a duplicate would match
+            candidates = {}
             for bill in recurring_bills:
+                if (bill.user_id, bill.name) in finished_loans:
+                    continue
                 next_due_date = calculate_next_due_date(bill)
+                if next_due_date and next_due_date >= current_date:
+                    due = datetime.combine(next_due_date, datetime.min.time())
+                    candidates.setdefault((bill.user_id, bill.name, due), bill)
+            
+            # One query finds the instances that already exist instead of one per bill.
+            # Paid ones count too: an EMI created ahead may be paid before the one before it.
+            existing = set()
+            if candidates:
+                existing = {tuple(row) for row in db.session.query(
+                    Bill.user_id, Bill.name, Bill.due_date
+                ).filter(
+                    tuple_(Bill.user_id, Bill.name, Bill.due_date).in_(list(candidates))
+                ).all()}
+            
+            for key, bill in candidates.items():
+                if key in existing:
+                    continue
                 
-                if next_due_date:
-                    # Check if a bill already exists for this next due date
-                    existing_bill = Bill.query.filter(
-                        Bill.user_id == bill.user_id,
-                        Bill.name == bill.name,
-                        Bill.due_date == next_due_date,
-                        Bill.is_paid == False
-                    ).first()
-                    
-                    if not existing_bill and next_due_date >= current_date:
-                        # Create new bill instance for the next period
-                        new_bill = Bill(
-                            user_id=bill.user_id,
-                            name=bill.name,
-                            amount=bill.amount,
-                            due_date=datetime.combine(next_due_date, datetime.min.time()),
-                            category=bill.category,
-                            frequency=bill.frequency,
-                            is_paid=False,
-                            notes=f"Auto-generated from recurring bill",
-                            enable_whatsapp=bill.enable_whatsapp,
-                            enable_call=bill.enable_call,
-                            enable_sms=bill.enable_sms,
-                            enable_local_notification=bill.enable_local_notification
-                        )
-                        
-                        db.session.add(new_bill)
-                        logger.info(f"[RECURRING CHECK] Created new recurring bill for {bill.name} due on {next_due_date}")
+                # Create new bill instance for the next period
+                new_bill = Bill(
+                    user_id=bill.user_id,
+                    name=bill.name,
+                    amount=bill.amount,
+                    due_date=key[2],
+                    category=bill.category,
+                    frequency=bill.frequency,
+                    is_paid=False,
+                    notes=f"Auto-generated from recurring bill",
+                    enable_whatsapp=bill.enable_whatsapp,
+                    enable_call=bill.enable_call,
+                    enable_sms=bill.enable_sms,
+                    enable_local_notification=bill.enable_local_notification
+                )
+                
+                db.session.add(new_bill)
+                logger.info(f"[RECURRING CHECK] Created new recurring bill for {bill.name} due on {key[2].date()}")
             
             try:
                 db.session.commit()
@@ -232,15 +276,8 @@ def start_scheduler(app):
         bill_due_date = bill.due_date.date() if hasattr(bill.due_date, 'date') else bill.due_date
         current_date = datetime.now().date()
         
-        if bill.frequency == 'weekly':
-            next_date = bill_due_date + timedelta(weeks=1)
-        elif bill.frequency == 'monthly':
-            next_date = bill_due_date + relativedelta(months=1)
-        elif bill.frequency == 'quarterly':
-            next_date = bill_due_date + relativedelta(months=3)
-        elif bill.frequency == 'yearly':
-            next_date = bill_due_date + relativedelta(years=1)
-        else:
+        next_date = shift_by_frequency(bill_due_date, bill.frequency)
+        if next_date is None:
             return None
         
         # Only return if the next date is in the future